@@ -1,32 +1,151 @@
-from flask import Flask
+import queue
+
+import click
+from flask import Flask, current_app, request, send_file, url_for
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
-from flask_restx import Api, Resource, reqparse
-from sqlalchemy import exc
-from models import db, Employee, Position, Role, Salary, Attendance, Country
+from flask_restx import Api, Namespace, Resource, reqparse, inputs
+from sqlalchemy import exc, extract, func, insert, select, tuple_, union_all
+from sqlalchemy.orm import aliased, selectinload
+from models import db, Employee, Gender, Position, Role, Salary, Attendance, AttendanceArchive, AttendanceMonthly, Country
 from config import Config
+import compression
+import metrics
+import routing
+from cache import cached, collection_etag, response_cache
+from bulk import validate_items, reject, insert_chunks, write_chunks, bulk_response, payload_error, update_where, delete_where, write_where
+from archive import archive_attendances, archive_cutoff, replace_archived
+from bitmaps import MAX_CALENDAR_DAYS, calendars, day_bit, recorded_on
+from export import EXPORT_FORMATS, export_response
+from reports import REPORT_COMPRESSIONS, report_jobs
+from upsert import upsert
+from rollups import period_of, format_period, keys_where as rollup_keys_where, lock as lock_rollups, refresh as refresh_rollups, rebuild as rebuild_rollups
+from lookups import genders, roles
+from search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, prefix_search, search_index
+from sync import delta, record_deletes
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, page_headers, resolve_sort
+from serializers import Coded, Serializer, output_json
+from writebuffer import WriteBuffer
 from datetime import datetime
 
-# Initialize Flask application
-app = Flask(__name__)
-
-# Load configuration
-app.config.from_object(Config())
-
-# Initialize API
-api = Api(app, version='1.0', title='Employee Management API', description='API for managing employees and related data')
-api_ns = api.namespace('api', description='Employee Management Endpoints')
-
-# Initialize database
-db.init_app(app)
-
-# Create all tables
-with app.app_context():
-    db.create_all()
+# API namespace; its resources are registered on each app by create_app
+api_ns = Namespace('api', description='Employee Management Endpoints')
 
 # List of allowed genders
 ALLOWED_GENDERS = ['Male', 'Female', 'Other']
 
 
+# --- Parsers shared by the collection endpoints ---
+list_parser = reqparse.RequestParser()
+list_parser.add_argument('limit', type=inputs.int_range(1, MAX_PAGE_SIZE), location='args', default=DEFAULT_PAGE_SIZE, help=f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+list_parser.add_argument('cursor', type=str, location='args', help="Cursor returned by the previous page")
+list_parser.add_argument('sort', type=str, location='args', default='id', help="Sort field, prefix with '-' for descending order")
+list_parser.add_argument('fields', type=str, location='args', help="Comma-separated fields to return; all fields by default")
+
+# Delta sync for the collections with change tracking
+sync_parser = list_parser.copy()
+sync_parser.add_argument('updated_since', type=str, location='args', help="ISO 8601 timestamp or the sync_token of the previous delta response")
+
+# Fields the collection endpoints can be sorted by (the 'id' entry is the keyset tie-breaker)
+EMPLOYEE_SORTS = {'id': Employee.id, 'first_name': Employee.first_name, 'last_name': Employee.last_name}
+POSITION_SORTS = {'id': Position.id, 'name': Position.name}
+ROLE_SORTS = {'id': Role.id, 'name': Role.name}
+SALARY_SORTS = {'id': Salary.id, 'amount': Salary.amount}
+ATTENDANCE_SORTS = {'id': Attendance.id, 'date': Attendance.date}
+COUNTRY_SORTS = {'id': Country.id, 'country_name': Country.name}
+GENDER_SORTS = {'id': Gender.id, 'name': Gender.name}
+
+
+# --- Serializers ---
+employee_serializer = Serializer(
+    id=Employee.id,
+    first_name=Employee.first_name,
+    last_name=Employee.last_name,
+    email=Employee.email,
+    phone_number=Employee.phone_number,
+    gender=Coded(Employee.gender_id, genders),
+    role=Coded(Employee.role_id, roles),
+    status=Employee.status,
+)
+salary_serializer = Serializer(id=Salary.id, employee_id=Salary.employee_id, amount=Salary.amount, status=Salary.status)
+attendance_serializer = Serializer(
+    id=Attendance.id,
+    employee_id=Attendance.employee_id,
+    date=Attendance.date,
+    status=Attendance.status,
+    created_at=Attendance.created_at,
+    updated_at=Attendance.updated_at,
+)
+position_serializer = Serializer(id=Position.id, name=Position.name, description=Position.description)
+role_serializer = Serializer(id=Role.id, name=Role.name, description=Role.description)
+country_serializer = Serializer(id=Country.id, country_name=Country.name)
+gender_serializer = Serializer(id=Gender.id, name=Gender.name)
+
+
+def projected(serializer, fields, args, sorts):
+    """Query the requested fields plus the keyset columns of the requested sort as plain rows."""
+    column, _ = resolve_sort(args.get('sort'), sorts)
+    return serializer.query(fields, sorts['id'], column)
+
+
+# --- Related data embedded in employee reads ---
+# Relationship, related model, recency order and serializer of each includable collection
+EMPLOYEE_INCLUDES = {
+    'salaries': (Employee.salaries, Salary, Salary.id.desc(), salary_serializer),
+    'attendances': (Employee.attendances, Attendance, Attendance.date.desc(), attendance_serializer),
+}
+
+
+def parse_includes(args):
+    """The related collections requested by the `include` argument."""
+    names = [name.strip() for name in (args.get('include') or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in EMPLOYEE_INCLUDES]
+    if unknown:
+        raise ValueError(f"Invalid include '{unknown[0]}'. Allowed values are: {', '.join(EMPLOYEE_INCLUDES)}")
+    return names
+
+
+def include_options(names, args):
+    """selectinload options for the included collections that are loaded in full."""
+    return [selectinload(EMPLOYEE_INCLUDES[name][0]) for name in names if not args.get(f'{name}_limit')]
+
+
+def load_latest(model, order, employee_ids, limit):
+    """Load at most `limit` rows of `model` per employee with a single ROW_NUMBER() query."""
+    row_number = func.row_number().over(partition_by=model.employee_id, order_by=order).label('row_number')
+    ranked = select(model, row_number).where(model.employee_id.in_(employee_ids)).subquery()
+    latest = aliased(model, ranked)
+    related = {}
+    for row in db.session.scalars(select(latest).where(ranked.c.row_number <= limit).order_by(ranked.c.row_number)):
+        related.setdefault(row.employee_id, []).append(row)
+    return related
+
+
+def serialize_employees(employees, names, args, fields=None):
+    """
+    Serialize employees with their included collections.
+
+    Full collections were already fetched by `include_options`; limited ones
+    are loaded here, so the number of queries is fixed by the number of
+    included collections whatever the number of employees.
+    """
+    limited = {}
+    employee_ids = [e.id for e in employees]
+    for name in names:
+        if args.get(f'{name}_limit') and employee_ids:
+            _, model, order, _ = EMPLOYEE_INCLUDES[name]
+            limited[name] = load_latest(model, order, employee_ids, args[f'{name}_limit'])
+
+    result = []
+    for e in employees:
+        item = employee_serializer.dump(e, fields)
+        for name in names:
+            related = limited[name].get(e.id, []) if name in limited else getattr(e, name)
+            item[name] = [EMPLOYEE_INCLUDES[name][3].dump(r) for r in related]
+        result.append(item)
+    return result
+
+
 # --- Parsers for Employee ---
 post_employee_parser = reqparse.RequestParser()
 post_employee_parser.add_argument('first_name', type=str, required=True, help="First name is required")
@@ -46,41 +165,136 @@ put_employee_parser.add_argument('gender', type=str, required=True, choices=ALLO
 put_employee_parser.add_argument('role', type=str, required=True, help="Role name is required")  # Role name as a string
 put_employee_parser.add_argument('status', type=str, choices=['Active', 'Inactive'], required=True, help="Status must be 'Active' or 'Inactive'")
 
+list_employee_parser = sync_parser.copy()
+list_employee_parser.add_argument('status', type=str, location='args', choices=['Active', 'Inactive'], help="Status must be 'Active' or 'Inactive'")
+list_employee_parser.add_argument('role', type=str, location='args', help="Filter by role name")
+list_employee_parser.add_argument('gender', type=str, location='args', choices=ALLOWED_GENDERS, help=f"Gender must be one of {', '.join(ALLOWED_GENDERS)}")
+
+search_parser = reqparse.RequestParser()
+search_parser.add_argument('q', type=str, location='args', required=True, help="Search text: part of a name, email or phone number")
+search_parser.add_argument('limit', type=inputs.int_range(1, MAX_SEARCH_LIMIT), location='args', default=DEFAULT_SEARCH_LIMIT, help=f"Limit must be between 1 and {MAX_SEARCH_LIMIT}")
+search_parser.add_argument('fields', type=str, location='args', help="Comma-separated fields to return; all fields by default")
+
+# Related collections embedded in employee reads
+include_parser = reqparse.RequestParser()
+include_parser.add_argument('include', type=str, location='args', help="Comma-separated related collections to embed: salaries, attendances")
+include_parser.add_argument('salaries_limit', type=inputs.int_range(1, MAX_PAGE_SIZE), location='args', help="Embed at most this many of the latest salaries per employee")
+include_parser.add_argument('attendances_limit', type=inputs.int_range(1, MAX_PAGE_SIZE), location='args', help="Embed at most this many of the latest attendance records per employee")
+for argument in include_parser.args:
+    list_employee_parser.add_argument(argument)
+
+# Set-based PATCH/DELETE select rows with the collection filters, where employee IDs may be lists
+LIST_ONLY_ARGS = ('limit', 'cursor', 'sort', 'fields', 'updated_since')
+
+where_employee_parser = list_employee_parser.copy()
+for name in LIST_ONLY_ARGS + tuple(argument.name for argument in include_parser.args):
+    where_employee_parser.remove_argument(name)
+where_employee_parser.add_argument('id', type=int, action='split', location='args', help="Comma-separated employee IDs")
+where_employee_parser.add_argument('dry_run', type=inputs.boolean, location='args', default=False, help="Only count the matching rows")
+
+# Only the JSON body holds changes; the query string holds the filters
+patch_employees_parser = reqparse.RequestParser()
+patch_employees_parser.add_argument('status', type=str, choices=['Active', 'Inactive'], location='json', store_missing=False, help="Status must be 'Active' or 'Inactive'")
+patch_employees_parser.add_argument('role', type=str, location='json', store_missing=False, help="Role name")
+patch_employees_parser.add_argument('gender', type=str, choices=ALLOWED_GENDERS, location='json', store_missing=False, help=f"Gender must be one of {', '.join(ALLOWED_GENDERS)}")
+
+
+def changes_error(parser):
+    """Error response for a set-based PATCH whose body changes nothing."""
+    names = ', '.join(argument.name for argument in parser.args)
+    return {'message': f'Request body must set at least one of: {names}'}, 400
+
+
+def id_criterion(column, value):
+    """Match `column` against one ID or, from the set-based filters, a list of IDs."""
+    return column.in_(value) if isinstance(value, list) else column == value
+
+
+def employee_filters(args):
+    """SQL criteria for the employee collection filters."""
+    criteria = []
+    if args.get('id'):
+        criteria.append(Employee.id.in_(args['id']))
+    if args.get('status'):
+        criteria.append(Employee.status == args['status'])
+    # Unknown names resolve to None, which matches no employee
+    if args.get('role'):
+        criteria.append(Employee.role_id == roles.id(args['role']))
+    if args.get('gender'):
+        criteria.append(Employee.gender_id == genders.id(args['gender']))
+    return criteria
+
+
+def employee_keys(args):
+    """
+    Resolve the role and gender names of an employee payload to their IDs.
+
+    Returns the `role_id`/`gender_id` column values and a dict of errors for
+    the names that do not exist.
+    """
+    values, errors = {}, {}
+    for name, lookup, label in (('role', roles, 'Role'), ('gender', genders, 'Gender')):
+        row_id = lookup.id(args[name])
+        if row_id is None:
+            errors[name] = f"{label} '{args[name]}' does not exist"
+        values[f'{name}_id'] = row_id
+    return values, errors
+
+
+def employee_values(args, keys):
+    """The column values of a validated employee payload, with its names replaced by the resolved `keys`."""
+    return {**{k: v for k, v in args.items() if k not in ('role', 'gender')}, **keys}
+
+
 
 # --- Routes for Employee ---
 @api_ns.route('/employees')
 class AllEmployeeResource(Resource):
     """Resource for managing employees."""
 
+    @api_ns.expect(list_employee_parser)
     def get(self):
-        """Get all employees."""
-        employees = db.session.query(Employee).all()
-        return [
-            {
-                'id': e.id,
-                'first_name': e.first_name,
-                'last_name': e.last_name,
-                'email': e.email,
-                'phone_number': e.phone_number,
-                'gender': e.gender,
-                'role': e.role,
-                'status': e.status,
-            } for e in employees
-        ], 200
-
-    @api.expect(post_employee_parser)
+        """Get a page of employees, optionally filtered by status, role or gender."""
+        args = list_employee_parser.parse_args()
+        try:
+            fields = employee_serializer.parse_fields(args['fields'])
+            includes = parse_includes(args)
+            if args['updated_since']:
+                if includes:
+                    raise ValueError('include cannot be combined with updated_since')
+                query = employee_serializer.query(fields, Employee.id, Employee.updated_at).filter(*employee_filters(args))
+                return delta(Employee, query, args, lambda row: employee_serializer.dump(row, fields)), 200
+            headers = {}
+            if includes:
+                # Embedding related collections needs entities for selectinload
+                query = db.session.query(Employee).options(*include_options(includes, args))
+            else:
+                # Role and gender names are part of the body, so their renames change the ETag too
+                headers, not_modified = collection_etag(Employee, employee_filters(args), args, EMPLOYEE_SORTS,
+                                                           roles.digest(), genders.digest())
+                if not_modified:
+                    return not_modified
+                query = projected(employee_serializer, fields, args, EMPLOYEE_SORTS)
+            employees, next_cursor = paginate(query.filter(*employee_filters(args)), args, EMPLOYEE_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return serialize_employees(employees, includes, args, fields), 200, {**headers, **page_headers(next_cursor)}
+
+    @api_ns.expect(post_employee_parser)
     def post(self):
         """Create a new employee."""
         args = post_employee_parser.parse_args()
+        keys, errors = employee_keys(args)
+        if errors:
+            return {'errors': errors, 'message': 'Input payload validation failed'}, 400
         try:
             new_employee = Employee(
                 first_name=args['first_name'],
                 last_name=args['last_name'],
                 email=args['email'],
                 phone_number=args['phone_number'],
-                gender=args['gender'],  # Ensure this matches your model's attribute
-                role=args['role'],
                 status=args['status'],
+                **keys,
             )
             db.session.add(new_employee)
             db.session.commit()
@@ -88,40 +302,118 @@ class AllEmployeeResource(Resource):
         except Exception as e:
             return {'message': str(e)}, 500
 
+    @api_ns.expect(where_employee_parser, patch_employees_parser)
+    def patch(self):
+        """Update the status, role or gender of every employee matching the filters in one statement."""
+        where = where_employee_parser.parse_args()
+        changes = patch_employees_parser.parse_args()
+        if not changes:
+            return changes_error(patch_employees_parser)
+        values, errors = {}, {}
+        for name, value in changes.items():
+            lookup = {'role': roles, 'gender': genders}.get(name)
+            if lookup is None:
+                values[name] = value
+            elif lookup.id(value) is None:
+                errors[name] = f"{name.capitalize()} '{value}' does not exist"
+            else:
+                values[f'{name}_id'] = lookup.id(value)
+        if errors:
+            return {'errors': errors, 'message': 'Input payload validation failed'}, 400
+        criteria = employee_filters(where)
+        return write_where(Employee, criteria, lambda: update_where(Employee, criteria, values), where['dry_run'], 'updated')
+
+
+@api_ns.route('/employees/search')
+class EmployeeSearchResource(Resource):
+    """Resource for looking employees up by name, email or phone number."""
+
+    @api_ns.expect(search_parser)
+    def get(self):
+        """Search employees by partial name, email or phone number, best matches first."""
+        args = search_parser.parse_args()
+        q = args['q'].strip()
+        if not q:
+            return {'message': 'Search text must not be empty'}, 400
+        try:
+            fields = employee_serializer.parse_fields(args['fields'])
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+        query = employee_serializer.query(fields, Employee.id)
+        ids = search_index.search(q, args['limit'])
+        if ids is None:
+            # Without the in-memory index (or for queries under 3 characters) match prefixes in SQL
+            employees = prefix_search(query, q).limit(args['limit']).all()
+        else:
+            by_id = {row.id: row for row in query.filter(Employee.id.in_(ids))} if ids else {}
+            employees = [by_id[i] for i in ids if i in by_id]
+        return [employee_serializer.dump(e, fields) for e in employees], 200
+
+
+@api_ns.route('/employees/bulk')
+class EmployeeBulkResource(Resource):
+    """Resource for creating employees in bulk."""
+
+    def post(self):
+        """Create employees from a JSON array, reporting a result per item."""
+        items = request.get_json(silent=True)
+        error = payload_error(items)
+        if error:
+            return error
+        valid, results = validate_items(post_employee_parser, items)
+
+        # Emails are unique, so reject duplicates (within the batch or already stored) up front
+        emails = [args['email'] for _, args in valid]
+        existing = set(db.session.scalars(select(Employee.email).where(Employee.email.in_(emails))))
+        rows = []
+        for index, args in valid:
+            keys, errors = employee_keys(args)
+            if args['email'] in existing:
+                errors['email'] = f"Email '{args['email']}' already exists"
+            if errors:
+                reject(results, index, errors)
+                continue
+            existing.add(args['email'])
+            rows.append((index, employee_values(args, keys)))
+
+        insert_chunks(Employee, rows, results)
+        return bulk_response(results)
+
 
 @api_ns.route('/employees/<int:id>')
 class EmployeeResource(Resource):
     """Resource for retrieving, updating, and deleting a specific employee."""
 
+    @api_ns.expect(include_parser)
     def get(self, id):
-        """Get a specific employee by ID."""
-        employee = db.session.query(Employee).filter(Employee.id == id).first()
+        """Get a specific employee by ID, optionally with related salaries and attendances."""
+        args = include_parser.parse_args()
+        try:
+            includes = parse_includes(args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        employee = db.session.query(Employee).options(*include_options(includes, args)).filter(Employee.id == id).first()
         if employee:
-            return {
-                'id': employee.id,
-                'first_name': employee.first_name,
-                'last_name': employee.last_name,
-                'email': employee.email,
-                'phone_number': employee.phone_number,
-                'gender': employee.gender,  # Ensure this matches your model's attribute
-                'role': employee.role,
-                'status': employee.status,
-            }, 200
+            return serialize_employees([employee], includes, args)[0], 200
         return {'message': 'Employee not found'}, 404
 
-    @api.expect(put_employee_parser)
+    @api_ns.expect(put_employee_parser)
     def put(self, id):
         """Update an employee by ID."""
         args = put_employee_parser.parse_args()
         employee = db.session.query(Employee).filter(Employee.id == id).first()
 
         if employee:
+            keys, errors = employee_keys(args)
+            if errors:
+                return {'errors': errors, 'message': 'Input payload validation failed'}, 400
             employee.first_name = args['first_name']
             employee.last_name = args['last_name']
             employee.email = args['email']
             employee.phone_number = args['phone_number']
-            employee.gender = args['gender']  # Ensure this matches your model's attribute
-            employee.role = args['role']
+            employee.gender_id = keys['gender_id']
+            employee.role_id = keys['role_id']
             employee.status = args['status']
             try:
                 db.session.commit()
@@ -131,9 +423,12 @@ class EmployeeResource(Resource):
         return {'message': 'Employee not found'}, 404
 
     def delete(self, id):
-        """Delete an employee by ID."""
+        """Delete an employee by ID, with their salaries, attendance records and rollups."""
         employee = db.session.query(Employee).filter(Employee.id == id).first()
         if employee:
+            # The database cascades the delete; delta-sync clients still need tombstones for the children
+            record_deletes(Salary, [Salary.employee_id == id])
+            record_deletes(Attendance, [Attendance.employee_id == id])
             db.session.delete(employee)
             try:
                 db.session.commit()
@@ -156,12 +451,19 @@ put_position_parser.add_argument('description', type=str, required=False, help="
 class AllPositionResource(Resource):
     """Resource for managing positions."""
 
+    @api_ns.expect(list_parser)
+    @cached('positions')
     def get(self):
-        """Get all positions."""
-        positions = db.session.query(Position).all()
-        return [{'id': p.id, 'name': p.name, 'description': p.description} for p in positions], 200
+        """Get a page of positions."""
+        args = list_parser.parse_args()
+        try:
+            fields = position_serializer.parse_fields(args['fields'])
+            positions, next_cursor = paginate(projected(position_serializer, fields, args, POSITION_SORTS), args, POSITION_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [position_serializer.dump(p, fields) for p in positions], 200, page_headers(next_cursor)
 
-    @api.expect(post_position_parser)
+    @api_ns.expect(post_position_parser)
     def post(self):
         """Create a new position."""
         args = post_position_parser.parse_args()
@@ -175,14 +477,15 @@ class AllPositionResource(Resource):
 class PositionResource(Resource):
     """Resource for retrieving, updating, and deleting a specific position."""
 
+    @cached('positions')
     def get(self, id):
         """Get a specific position by ID."""
         position = db.session.query(Position).filter(Position.id == id).first()
         if position:
-            return {'id': position.id, 'name': position.name, 'description': position.description}, 200
+            return position_serializer.dump(position), 200
         return {'message': 'Position not found'}, 404
 
-    @api.expect(put_position_parser)
+    @api_ns.expect(put_position_parser)
     def put(self, id):
         """Update a position by ID."""
         args = put_position_parser.parse_args()
@@ -219,19 +522,249 @@ post_salary_parser.add_argument('employee_id', type=int, required=True, help="Em
 post_salary_parser.add_argument('amount', type=float, required=True, help="Salary amount is required")
 post_salary_parser.add_argument('status', type=str, required=False, help="Status is optional")
 
+# Bulk items are validated like single posts, with the status check the post handler does by hand
+bulk_salary_parser = post_salary_parser.copy()
+bulk_salary_parser.replace_argument('status', type=str, choices=['Active', 'Inactive'], default='Active', help="Status must be 'Active' or 'Inactive'")
+
 put_salary_parser = reqparse.RequestParser()
 put_salary_parser.add_argument('amount', type=float, required=False, help="Salary amount is optional")
 put_salary_parser.add_argument('status', type=str, required=False, help="Status is optional")
 
+list_salary_parser = sync_parser.copy()
+list_salary_parser.add_argument('employee_id', type=int, location='args', help="Filter by employee ID")
+list_salary_parser.add_argument('status', type=str, location='args', choices=['Active', 'Inactive'], help="Status must be 'Active' or 'Inactive'")
+
+export_salary_parser = list_salary_parser.copy()
+for name in ('limit', 'cursor', 'sort', 'updated_since'):
+    export_salary_parser.remove_argument(name)
+export_salary_parser.add_argument('format', type=str, location='args', choices=list(EXPORT_FORMATS), default='ndjson', help=f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+
+where_salary_parser = list_salary_parser.copy()
+for name in LIST_ONLY_ARGS:
+    where_salary_parser.remove_argument(name)
+where_salary_parser.replace_argument('employee_id', type=int, action='split', location='args', help="Comma-separated employee IDs")
+where_salary_parser.add_argument('dry_run', type=inputs.boolean, location='args', default=False, help="Only count the matching rows")
+
+patch_salaries_parser = reqparse.RequestParser()
+patch_salaries_parser.add_argument('amount', type=float, location='json', store_missing=False, help="Salary amount must be a number")
+patch_salaries_parser.add_argument('status', type=str, choices=['Active', 'Inactive'], location='json', store_missing=False, help="Status must be 'Active' or 'Inactive'")
+
 # Parsers for Attendance
 post_attendance_parser = reqparse.RequestParser()
 post_attendance_parser.add_argument('employee_id', type=int, required=True, help="Employee ID is required")
 post_attendance_parser.add_argument('date', type=str, required=True, help="Date (YYYY-MM-DD) is required")
 post_attendance_parser.add_argument('status', type=str, choices=['Present', 'Absent'], required=False, default='Present', help="Status must be 'Present' or 'Absent'")
 
+def attendance_date(value):
+    """Parse an attendance date in YYYY-MM-DD format."""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# Bulk items are validated like single posts, with the date parsed up front
+bulk_attendance_parser = post_attendance_parser.copy()
+bulk_attendance_parser.replace_argument('date', type=attendance_date, required=True, help="Date (YYYY-MM-DD) is required")
+
 put_attendance_parser = reqparse.RequestParser()
 put_attendance_parser.add_argument('status', type=str, choices=['Present', 'Absent'], required=True, help="Status must be 'Present' or 'Absent'")
 
+list_attendance_parser = sync_parser.copy()
+list_attendance_parser.add_argument('employee_id', type=int, location='args', help="Filter by employee ID")
+list_attendance_parser.add_argument('date_from', type=inputs.date_from_iso8601, location='args', help="Start date (YYYY-MM-DD), inclusive")
+list_attendance_parser.add_argument('date_to', type=inputs.date_from_iso8601, location='args', help="End date (YYYY-MM-DD), inclusive")
+list_attendance_parser.add_argument('status', type=str, location='args', choices=['Present', 'Absent'], help="Status must be 'Present' or 'Absent'")
+list_attendance_parser.add_argument('include_archived', type=inputs.boolean, location='args', default=False, help="Also read the archived records")
+
+export_attendance_parser = list_attendance_parser.copy()
+for name in ('limit', 'cursor', 'sort', 'updated_since'):
+    export_attendance_parser.remove_argument(name)
+export_attendance_parser.add_argument('format', type=str, location='args', choices=list(EXPORT_FORMATS), default='ndjson', help=f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+
+where_attendance_parser = list_attendance_parser.copy()
+for name in LIST_ONLY_ARGS + ('include_archived',):
+    where_attendance_parser.remove_argument(name)
+where_attendance_parser.replace_argument('employee_id', type=int, action='split', location='args', help="Comma-separated employee IDs")
+where_attendance_parser.add_argument('date', type=inputs.date_from_iso8601, location='args', help="Date (YYYY-MM-DD)")
+where_attendance_parser.add_argument('dry_run', type=inputs.boolean, location='args', default=False, help="Only count the matching rows")
+
+patch_attendances_parser = reqparse.RequestParser()
+patch_attendances_parser.add_argument('status', type=str, choices=['Present', 'Absent'], location='json', store_missing=False, help="Status must be 'Present' or 'Absent'")
+
+# Parsers for report jobs: the export filters, with CSV as the default format
+report_parser = reqparse.RequestParser()
+report_parser.add_argument('report', type=str, location='args', required=True, choices=['salaries', 'attendances'], help="Report must be 'salaries' or 'attendances'")
+report_parser.add_argument('compression', type=str, location='args', choices=REPORT_COMPRESSIONS, default='gzip', help=f"Compression must be one of {', '.join(REPORT_COMPRESSIONS)}")
+
+report_salary_parser = export_salary_parser.copy()
+report_salary_parser.replace_argument('format', type=str, location='args', choices=list(EXPORT_FORMATS), default='csv', help=f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+
+report_attendance_parser = export_attendance_parser.copy()
+report_attendance_parser.replace_argument('format', type=str, location='args', choices=list(EXPORT_FORMATS), default='csv', help=f"Format must be one of {', '.join(EXPORT_FORMATS)}")
+
+
+def salary_filters(args):
+    """SQL criteria for the salary collection filters."""
+    criteria = []
+    if args.get('employee_id') is not None:
+        criteria.append(id_criterion(Salary.employee_id, args['employee_id']))
+    if args.get('status'):
+        criteria.append(Salary.status == args['status'])
+    return criteria
+
+
+def check_employees(valid, results):
+    """
+    Keep the bulk items whose employee exists, checking all referenced
+    employee IDs with a single query.
+    """
+    employee_ids = {args['employee_id'] for _, args in valid}
+    existing = set(db.session.scalars(select(Employee.id).where(Employee.id.in_(employee_ids))))
+    rows = []
+    for index, args in valid:
+        if args['employee_id'] not in existing:
+            reject(results, index, {'employee_id': f"Employee with ID {args['employee_id']} does not exist"})
+            continue
+        rows.append((index, dict(args)))
+    return rows
+
+
+def attendance_keys(rows):
+    """The rollup keys, (employee_id, period) pairs, of attendance rows."""
+    return {(row['employee_id'], period_of(row['date'])) for row in rows}
+
+
+def insert_attendances(rows):
+    """Insert attendance records with one executemany INSERT, replacing archived ones, and refresh their rollups."""
+    keys = attendance_keys(rows)
+    lock_rollups(keys)
+    replace_archived((row['employee_id'], row['date']) for row in rows)
+    db.session.execute(insert(Attendance), rows)
+    refresh_rollups(keys)
+
+
+def reject_existing_attendances(rows, results):
+    """
+    Keep the attendance items whose (employee_id, date) neither exists nor
+    repeats an earlier item, checking them all with a single query.
+    """
+    existing = set(db.session.execute(
+        select(Attendance.employee_id, Attendance.date)
+        .where(tuple_(Attendance.employee_id, Attendance.date).in_({(r['employee_id'], r['date']) for _, r in rows}))
+    ).tuples()) if rows else set()
+    unique_rows = []
+    for index, row in rows:
+        key = (row['employee_id'], row['date'])
+        if key in existing:
+            reject(results, index, {'date': f"Attendance for employee {key[0]} on {key[1]} already exists"})
+            continue
+        existing.add(key)
+        unique_rows.append((index, row))
+    return unique_rows
+
+
+def upsert_attendances(rows):
+    """Insert or update attendance records keyed on (employee_id, date) in a single statement and refresh their rollups."""
+    keys = attendance_keys(rows)
+    lock_rollups(keys)
+    replace_archived((row['employee_id'], row['date']) for row in rows)
+    upsert(Attendance, rows, keys=['employee_id', 'date'], update=['status'], values={'updated_at': datetime.utcnow()})
+    refresh_rollups(keys)
+
+
+def flush_checkins(rows):
+    """
+    Write a batch of buffered check-ins with the same checks and single-transaction insert as a bulk POST.
+
+    A failing insert raises instead of failing every check-in of the batch:
+    the buffer then flushes the batch again in halves, which checks them
+    again, so e.g. a day written by a concurrent PUT fails only its own
+    check-in, as a conflict.
+    """
+    results = [None] * len(rows)
+    rows = reject_existing_attendances(check_employees(list(enumerate(rows)), results), results)
+    if rows:
+        insert_attendances([values for _, values in rows])
+        db.session.commit()
+        for index, _ in rows:
+            results[index] = {'index': index, 'status': 'created'}
+    return results
+
+
+# Group-commit buffer of POST /api/attendances, enabled by CHECKIN_BUFFER_ENABLED
+checkin_buffer = WriteBuffer(flush_checkins)
+
+
+def checkin_response(result):
+    """The response to a flushed check-in, matching the unbuffered POST."""
+    if result['status'] != 'error':
+        return {'message': 'Success'}, 201
+    errors = result['errors']
+    if 'employee_id' in errors:
+        return {'message': errors['employee_id']}, 404
+    if 'date' in errors:
+        return {'message': errors['date']}, 409
+    return {'message': errors['item']}, 500
+
+
+def attendance_filters(args, source=Attendance):
+    """SQL criteria for the attendance collection filters, on `source` (see attendance_source)."""
+    criteria = []
+    if args.get('employee_id') is not None:
+        criteria.append(id_criterion(source.employee_id, args['employee_id']))
+    if args.get('date'):
+        criteria.append(source.date == args['date'])
+    if args.get('date_from'):
+        criteria.append(source.date >= args['date_from'])
+    if args.get('date_to'):
+        criteria.append(source.date <= args['date_to'])
+    if args.get('status'):
+        criteria.append(source.status == args['status'])
+    return criteria
+
+
+def attendance_source(args):
+    """
+    The entity attendance reads select from and its serializer: the
+    attendance table, or with `include_archived` an alias of Attendance over
+    the UNION of the table and its archive, so old ranges cost nothing
+    unless a client asks for them. Like the rollups, it leaves out archived
+    records whose day has a record in the attendance table.
+    """
+    if not args.get('include_archived'):
+        return Attendance, attendance_serializer
+    records = union_all(
+        select(Attendance.__table__), select(AttendanceArchive.__table__).where(AttendanceArchive.unsuperseded())
+    ).subquery('attendance_records')
+    source = aliased(Attendance, records, adapt_on_names=True)
+    return source, attendance_serializer.aliased(source)
+
+def attendance_period(value):
+    """Parse a month in YYYY-MM format into a rollup period."""
+    return period_of(datetime.strptime(value, '%Y-%m'))
+
+
+# Parser for the attendance summaries
+attendance_summary_parser = reqparse.RequestParser()
+attendance_summary_parser.add_argument('from', type=attendance_period, location='args', help="First month (YYYY-MM), inclusive")
+attendance_summary_parser.add_argument('to', type=attendance_period, location='args', help="Last month (YYYY-MM), inclusive")
+
+# Parsers for the attendance calendars, pages of employees
+calendar_parser = list_parser.copy()
+for name in ('sort', 'fields'):
+    calendar_parser.remove_argument(name)
+calendar_parser.add_argument('employee_id', type=int, action='split', location='args', help="Comma-separated employee IDs; all employees by default")
+calendar_parser.add_argument('from', type=inputs.date_from_iso8601, location='args', required=True, help="First day (YYYY-MM-DD) is required")
+calendar_parser.add_argument('to', type=inputs.date_from_iso8601, location='args', required=True, help="Last day (YYYY-MM-DD) is required")
+
+calendar_day_parser = list_parser.copy()
+for name in ('sort', 'fields'):
+    calendar_day_parser.remove_argument(name)
+calendar_day_parser.add_argument('status', type=str, location='args', choices=['Present', 'Absent'], help="Status must be 'Present' or 'Absent'")
+
+# Parser for the payroll aggregates
+payroll_summary_parser = reqparse.RequestParser()
+payroll_summary_parser.add_argument('group_by', type=str, location='args', choices=['role', 'status', 'month'], default='role', help="Group by must be 'role', 'status' or 'month'")
+payroll_summary_parser.add_argument('status', type=str, location='args', choices=['Active', 'Inactive'], help="Status must be 'Active' or 'Inactive'; defaults to 'Active' unless grouping by status")
+
 # Parsers for Country
 post_country_parser = reqparse.RequestParser()
 post_country_parser.add_argument('country_name', type=str, required=True, help="Country name is required")
@@ -245,12 +778,19 @@ put_country_parser.add_argument('country_name', type=str, required=True, help="C
 class AllRoleResource(Resource):
     """Resource for managing roles."""
 
+    @api_ns.expect(list_parser)
+    @cached('roles')
     def get(self):
-        """Get all roles."""
-        roles = db.session.query(Role).all()
-        return [{'id': r.id, 'name': r.name, 'description': r.description} for r in roles], 200
+        """Get a page of roles."""
+        args = list_parser.parse_args()
+        try:
+            fields = role_serializer.parse_fields(args['fields'])
+            roles, next_cursor = paginate(projected(role_serializer, fields, args, ROLE_SORTS), args, ROLE_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [role_serializer.dump(r, fields) for r in roles], 200, page_headers(next_cursor)
 
-    @api.expect(post_role_parser)
+    @api_ns.expect(post_role_parser)
     def post(self):
         """Create a new role."""
         args = post_role_parser.parse_args()
@@ -264,20 +804,24 @@ class AllRoleResource(Resource):
 class RoleResource(Resource):
     """Resource for retrieving, updating, and deleting a specific role."""
 
+    @cached('roles')
     def get(self, id):
         """Get a specific role by ID."""
         role = db.session.query(Role).filter(Role.id == id).first()
         if role:
-            return {'id': role.id, 'name': role.name, 'description': role.description}, 200
+            return role_serializer.dump(role), 200
         return {'message': 'Role not found'}, 404
 
-    @api.expect(put_role_parser)
+    @api_ns.expect(put_role_parser)
     def put(self, id):
         """Update a role by ID."""
         args = put_role_parser.parse_args()
         role = db.session.query(Role).filter(Role.id == id).first()
 
         if role:
+            if args['name'] != role.name:
+                # Employees expose the role by name, so delta-sync clients must see them change with it
+                update_where(Employee, [Employee.role_id == role.id], {})
             role.name = args['name']
             role.description = args.get('description', role.description)
             db.session.commit()
@@ -289,7 +833,11 @@ class RoleResource(Resource):
         role = db.session.query(Role).filter(Role.id == id).first()
         if role:
             db.session.delete(role)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except exc.IntegrityError:
+                db.session.rollback()
+                return {'message': 'Role is assigned to employees'}, 409
             return {'message': 'Success'}, 200
         return {'message': 'Role not found'}, 404
 
@@ -299,12 +847,25 @@ class RoleResource(Resource):
 class AllSalaryResource(Resource):
     """Resource for managing salaries."""
 
+    @api_ns.expect(list_salary_parser)
     def get(self):
-        """Get all salaries."""
-        salaries = db.session.query(Salary).all()
-        return [{'id': s.id, 'employee_id': s.employee_id, 'amount': s.amount, 'status': s.status} for s in salaries], 200
-
-    @api.expect(post_salary_parser)
+        """Get a page of salaries, optionally filtered by employee or status."""
+        args = list_salary_parser.parse_args()
+        try:
+            fields = salary_serializer.parse_fields(args['fields'])
+            if args['updated_since']:
+                query = salary_serializer.query(fields, Salary.id, Salary.updated_at).filter(*salary_filters(args))
+                return delta(Salary, query, args, lambda row: salary_serializer.dump(row, fields)), 200
+            headers, not_modified = collection_etag(Salary, salary_filters(args), args, SALARY_SORTS)
+            if not_modified:
+                return not_modified
+            query = projected(salary_serializer, fields, args, SALARY_SORTS).filter(*salary_filters(args))
+            salaries, next_cursor = paginate(query, args, SALARY_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [salary_serializer.dump(s, fields) for s in salaries], 200, {**headers, **page_headers(next_cursor)}
+
+    @api_ns.expect(post_salary_parser)
     def post(self):
         """Create a new salary."""
         args = post_salary_parser.parse_args()
@@ -334,6 +895,55 @@ class AllSalaryResource(Resource):
             db.session.rollback()
             return {'message': str(e)}, 500
 
+    @api_ns.expect(where_salary_parser, patch_salaries_parser)
+    def patch(self):
+        """Update the amount or status of every salary matching the filters in one statement."""
+        where = where_salary_parser.parse_args()
+        changes = patch_salaries_parser.parse_args()
+        if not changes:
+            return changes_error(patch_salaries_parser)
+        criteria = salary_filters(where)
+        return write_where(Salary, criteria, lambda: update_where(Salary, criteria, changes), where['dry_run'], 'updated')
+
+    @api_ns.expect(where_salary_parser)
+    def delete(self):
+        """Delete every salary matching the filters in one statement."""
+        where = where_salary_parser.parse_args()
+        criteria = salary_filters(where)
+        return write_where(Salary, criteria, lambda: delete_where(Salary, criteria), where['dry_run'], 'deleted')
+
+
+@api_ns.route('/salaries/bulk')
+class SalaryBulkResource(Resource):
+    """Resource for creating salaries in bulk."""
+
+    def post(self):
+        """Create salaries from a JSON array, reporting a result per item."""
+        items = request.get_json(silent=True)
+        error = payload_error(items)
+        if error:
+            return error
+        valid, results = validate_items(bulk_salary_parser, items)
+        rows = check_employees(valid, results)
+        insert_chunks(Salary, rows, results)
+        return bulk_response(results)
+
+
+@api_ns.route('/salaries/export')
+class SalaryExportResource(Resource):
+    """Resource for streaming the salaries table."""
+
+    @api_ns.expect(export_salary_parser)
+    def get(self):
+        """Stream all salaries matching the filters as NDJSON or CSV."""
+        args = export_salary_parser.parse_args()
+        try:
+            fields = salary_serializer.parse_fields(args['fields'])
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        stmt = select(*salary_serializer.columns(fields)).where(*salary_filters(args)).order_by(Salary.id)
+        return export_response(stmt, fields, args['format'], 'salaries')
+
 
 @api_ns.route('/salaries/<int:id>')
 class SalaryResource(Resource):
@@ -343,10 +953,10 @@ class SalaryResource(Resource):
         """Get a specific salary by ID."""
         salary = db.session.query(Salary).filter(Salary.id == id).first()
         if salary:
-            return {'id': salary.id, 'employee_id': salary.employee_id, 'amount': salary.amount, 'status': salary.status}, 200
+            return salary_serializer.dump(salary), 200
         return {'message': 'Salary not found'}, 404
 
-    @api.expect(put_salary_parser)
+    @api_ns.expect(put_salary_parser)
     def put(self, id):
         """Update a salary by ID."""
         args = put_salary_parser.parse_args()
@@ -374,36 +984,175 @@ class SalaryResource(Resource):
 class AllAttendanceResource(Resource):
     """Resource for managing attendances."""
 
+    @api_ns.expect(list_attendance_parser)
     def get(self):
-        """Get all attendance records."""
-        attendances = db.session.query(Attendance).all()
-        return [
-            {
-                'id': a.id,
-                'employee_id': a.employee_id,
-                'date': a.date.strftime('%Y-%m-%d'),
-                'status': a.status,
-                'created_at': a.created_at,
-                'updated_at': a.updated_at,
-            } for a in attendances
-        ], 200
-
-    @api.expect(post_attendance_parser)
+        """Get a page of attendance records, optionally filtered by employee, date range or status."""
+        args = list_attendance_parser.parse_args()
+        try:
+            fields = attendance_serializer.parse_fields(args['fields'])
+            if args['updated_since']:
+                if args['include_archived']:
+                    # Archiving is not a change: delta sync only follows the attendance table
+                    raise ValueError('include_archived cannot be combined with updated_since')
+                query = attendance_serializer.query(fields, Attendance.id, Attendance.updated_at).filter(*attendance_filters(args))
+                return delta(Attendance, query, args, lambda row: attendance_serializer.dump(row, fields)), 200
+            source, serializer = attendance_source(args)
+            sorts = {name: getattr(source, column.key) for name, column in ATTENDANCE_SORTS.items()}
+            headers, not_modified = collection_etag(source, attendance_filters(args, source), args, sorts)
+            if not_modified:
+                return not_modified
+            query = projected(serializer, fields, args, sorts).filter(*attendance_filters(args, source))
+            attendances, next_cursor = paginate(query, args, sorts)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [serializer.dump(a, fields) for a in attendances], 200, {**headers, **page_headers(next_cursor)}
+
+    @api_ns.expect(post_attendance_parser)
     def post(self):
         """Create a new attendance record."""
         args = post_attendance_parser.parse_args()
+        if checkin_buffer.enabled:
+            return self.post_buffered(args)
+
+        # Check if the employee exists, so the unique conflict below is the only integrity error left
+        if db.session.get(Employee, args['employee_id']) is None:
+            return {'message': f"Employee with ID {args['employee_id']} does not exist"}, 404
+
         try:
             new_attendance = Attendance(
                 employee_id=args['employee_id'],
-                date=datetime.strptime(args['date'], '%Y-%m-%d'),
+                date=datetime.strptime(args['date'], '%Y-%m-%d').date(),
                 status=args['status']
             )
+            keys = [(new_attendance.employee_id, period_of(new_attendance.date))]
+            lock_rollups(keys)
+            replace_archived([(new_attendance.employee_id, new_attendance.date)])
             db.session.add(new_attendance)
+            refresh_rollups(keys)
             db.session.commit()
             return {'message': 'Success'}, 201
+        except exc.IntegrityError:
+            db.session.rollback()
+            return {'message': f"Attendance for employee {args['employee_id']} on {args['date']} already exists"}, 409
         except Exception as e:
             return {'message': str(e)}, 500
 
+    @api_ns.expect(where_attendance_parser, patch_attendances_parser)
+    def patch(self):
+        """Update the status of every attendance record matching the filters in one statement."""
+        where = where_attendance_parser.parse_args()
+        changes = patch_attendances_parser.parse_args()
+        if not changes:
+            return changes_error(patch_attendances_parser)
+        criteria = attendance_filters(where)
+
+        def write():
+            keys = rollup_keys_where(criteria)
+            lock_rollups(keys)
+            count = update_where(Attendance, criteria, changes)
+            refresh_rollups(keys)
+            return count
+        return write_where(Attendance, criteria, write, where['dry_run'], 'updated')
+
+    @api_ns.expect(where_attendance_parser)
+    def delete(self):
+        """Delete every attendance record matching the filters in one statement, e.g. all records of a date."""
+        where = where_attendance_parser.parse_args()
+        criteria = attendance_filters(where)
+
+        def write():
+            keys = rollup_keys_where(criteria)
+            lock_rollups(keys)
+            count = delete_where(Attendance, criteria)
+            refresh_rollups(keys)
+            return count
+        return write_where(Attendance, criteria, write, where['dry_run'], 'deleted')
+
+    def post_buffered(self, args):
+        """
+        Queue the record for the next group commit. The response waits for
+        that commit unless the client sends `Prefer: respond-async` or the
+        wait times out, in which case it is a 202 with a tracking URL.
+        """
+        try:
+            row = {'employee_id': args['employee_id'], 'date': attendance_date(args['date']), 'status': args['status']}
+        except ValueError:
+            return {'message': f"Invalid date '{args['date']}'. Expected format is YYYY-MM-DD"}, 400
+        try:
+            ticket = checkin_buffer.submit(row)
+        except queue.Full:
+            return {'message': 'Too many pending check-ins, retry shortly'}, 503, {'Retry-After': '1'}
+
+        respond_async = 'respond-async' in request.headers.get('Prefer', '')
+        if not respond_async and ticket.wait(current_app.config['CHECKIN_BUFFER_ACK_TIMEOUT']):
+            return checkin_response(ticket.result)
+        return ticket.dump(), 202, {'Location': url_for('api_checkin_resource', id=ticket.id)}
+
+
+@api_ns.route('/attendances/checkins/<string:id>')
+class CheckinResource(Resource):
+    """Resource for tracking a check-in accepted by the write buffer."""
+
+    def get(self, id):
+        """Get the state of a buffered check-in: queued, created or error."""
+        ticket = checkin_buffer.ticket(id)
+        if ticket is None:
+            return {'message': 'Check-in not found'}, 404
+        return ticket.dump(), 200
+
+
+@api_ns.route('/attendances/bulk')
+class AttendanceBulkResource(Resource):
+    """Resource for creating attendance records in bulk."""
+
+    def post(self):
+        """Create attendance records from a JSON array, reporting a result per item."""
+        items = request.get_json(silent=True)
+        error = payload_error(items)
+        if error:
+            return error
+        valid, results = validate_items(bulk_attendance_parser, items)
+        rows = reject_existing_attendances(check_employees(valid, results), results)
+        write_chunks(rows, results, insert_attendances)
+        return bulk_response(results)
+
+    def put(self):
+        """Create or update attendance records keyed on (employee_id, date), reporting a result per item."""
+        items = request.get_json(silent=True)
+        error = payload_error(items)
+        if error:
+            return error
+        valid, results = validate_items(bulk_attendance_parser, items)
+        rows = check_employees(valid, results)
+
+        # A statement may touch each key once, so the last item for an (employee_id, date) wins
+        latest = {}
+        for index, row in rows:
+            latest[(row['employee_id'], row['date'])] = (index, row)
+        write_chunks(list(latest.values()), results, upsert_attendances, 'upserted')
+        for index, row in rows:
+            winner = latest[(row['employee_id'], row['date'])][0]
+            if winner != index:
+                results[index] = {**results[winner], 'index': index, 'superseded_by': winner}
+        return bulk_response(results, 'upserted', 200)
+
+
+@api_ns.route('/attendances/export')
+class AttendanceExportResource(Resource):
+    """Resource for streaming the attendances table."""
+
+    @api_ns.expect(export_attendance_parser)
+    def get(self):
+        """Stream all attendance records matching the filters as NDJSON or CSV."""
+        args = export_attendance_parser.parse_args()
+        try:
+            fields = attendance_serializer.parse_fields(args['fields'])
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        source, serializer = attendance_source(args)
+        stmt = select(*serializer.columns(fields)).where(*attendance_filters(args, source)).order_by(source.id)
+        return export_response(stmt, fields, args['format'], 'attendances')
+
 
 @api_ns.route('/attendances/<int:id>')
 class AttendanceResource(Resource):
@@ -413,24 +1162,20 @@ class AttendanceResource(Resource):
         """Get a specific attendance record by ID."""
         attendance = db.session.query(Attendance).filter(Attendance.id == id).first()
         if attendance:
-            return {
-                'id': attendance.id,
-                'employee_id': attendance.employee_id,
-                'date': attendance.date.strftime('%Y-%m-%d'),
-                'status': attendance.status,
-                'created_at': attendance.created_at,
-                'updated_at': attendance.updated_at,
-            }, 200
+            return attendance_serializer.dump(attendance), 200
         return {'message': 'Attendance record not found'}, 404
 
-    @api.expect(put_attendance_parser)
+    @api_ns.expect(put_attendance_parser)
     def put(self, id):
         """Update an attendance record by ID."""
         args = put_attendance_parser.parse_args()
         attendance = db.session.query(Attendance).filter(Attendance.id == id).first()
 
         if attendance:
+            keys = [(attendance.employee_id, period_of(attendance.date))]
+            lock_rollups(keys)
             attendance.status = args['status']
+            refresh_rollups(keys)
             db.session.commit()
             return {'message': 'Success'}, 200
         return {'message': 'Attendance record not found'}, 404
@@ -439,27 +1184,219 @@ class AttendanceResource(Resource):
         """Delete an attendance record by ID."""
         attendance = db.session.query(Attendance).filter(Attendance.id == id).first()
         if attendance:
+            keys = [(attendance.employee_id, period_of(attendance.date))]
+            lock_rollups(keys)
             db.session.delete(attendance)
+            refresh_rollups(keys)
             db.session.commit()
             return {'message': 'Success'}, 200
         return {'message': 'Attendance record not found'}, 404
 
 
+@api_ns.route('/employees/<int:id>/attendance/<string:date>')
+class EmployeeAttendanceResource(Resource):
+    """Resource for idempotently recording an employee's attendance on a given date."""
+
+    @api_ns.expect(put_attendance_parser)
+    def put(self, id, date):
+        """Create or update the attendance record of an employee on a date (YYYY-MM-DD)."""
+        args = put_attendance_parser.parse_args()
+        try:
+            day = attendance_date(date)
+        except ValueError:
+            return {'message': f"Invalid date '{date}'. Expected format is YYYY-MM-DD"}, 400
+
+        try:
+            upsert_attendances([{'employee_id': id, 'date': day, 'status': args['status']}])
+            db.session.commit()
+            return {'message': 'Success'}, 200
+        except exc.IntegrityError:
+            db.session.rollback()
+            return {'message': f"Employee with ID {id} does not exist"}, 404
+
+
+# --- Routes for Attendance summaries ---
+def period_filters(args):
+    """SQL criteria restricting rollups to the requested months."""
+    criteria = []
+    if args['from']:
+        criteria.append(AttendanceMonthly.period >= args['from'])
+    if args['to']:
+        criteria.append(AttendanceMonthly.period <= args['to'])
+    return criteria
+
+
+@api_ns.route('/employees/<int:id>/attendance-summary')
+class EmployeeAttendanceSummaryResource(Resource):
+    """Resource for an employee's monthly attendance counts."""
+
+    @api_ns.expect(attendance_summary_parser)
+    def get(self, id):
+        """Get present/absent counts per month for an employee, read from the rollup table."""
+        args = attendance_summary_parser.parse_args()
+        rollups = db.session.execute(
+            select(AttendanceMonthly.period, AttendanceMonthly.present, AttendanceMonthly.absent)
+            .where(AttendanceMonthly.employee_id == id, *period_filters(args))
+            .order_by(AttendanceMonthly.period)
+        ).all()
+        return {
+            'employee_id': id,
+            'months': [{'month': format_period(r.period), 'present': r.present, 'absent': r.absent} for r in rollups],
+            'present': sum(r.present for r in rollups),
+            'absent': sum(r.absent for r in rollups),
+        }, 200
+
+
+@api_ns.route('/attendance-summary')
+class AttendanceSummaryResource(Resource):
+    """Resource for organization-wide monthly attendance counts."""
+
+    @api_ns.expect(attendance_summary_parser)
+    def get(self):
+        """Get present/absent counts per month across all employees, read from the rollup table."""
+        args = attendance_summary_parser.parse_args()
+        rollups = db.session.execute(
+            select(
+                AttendanceMonthly.period,
+                func.sum(AttendanceMonthly.present).label('present'),
+                func.sum(AttendanceMonthly.absent).label('absent'),
+                func.count(AttendanceMonthly.employee_id).label('employees'),
+            )
+            .where(*period_filters(args))
+            .group_by(AttendanceMonthly.period)
+            .order_by(AttendanceMonthly.period)
+        ).all()
+        return [
+            {'month': format_period(r.period), 'present': int(r.present), 'absent': int(r.absent), 'employees': r.employees}
+            for r in rollups
+        ], 200
+
+
+@api_ns.route('/attendances/calendar')
+class AttendanceCalendarResource(Resource):
+    """Resource for the attendance calendars of many employees, read from the rollup bitmaps."""
+
+    @api_ns.expect(calendar_parser)
+    def get(self):
+        """
+        Get a page of employees with their attendance from `from` to `to`:
+        one character per day, P (present), A (absent) or . (no record),
+        and the present and absent counts over the range.
+        """
+        args = calendar_parser.parse_args()
+        first, last = args['from'], args['to']
+        if last < first or (last - first).days >= MAX_CALENDAR_DAYS:
+            return {'message': f"'to' must be on or after 'from' and cover at most {MAX_CALENDAR_DAYS} days"}, 400
+        query = db.session.query(Employee.id)
+        if args['employee_id']:
+            query = query.filter(Employee.id.in_(args['employee_id']))
+        try:
+            employees, next_cursor = paginate(query, args, {'id': Employee.id})
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        result = calendars([e.id for e in employees], first, last)
+        return [
+            {'employee_id': e.id, 'calendar': result[e.id][0], 'present': result[e.id][1], 'absent': result[e.id][2]}
+            for e in employees
+        ], 200, page_headers(next_cursor)
+
+
+@api_ns.route('/attendances/calendar/<string:day>')
+class AttendanceCalendarDayResource(Resource):
+    """Resource for the employees with a record on one day, read from the rollup bitmaps."""
+
+    @api_ns.expect(calendar_day_parser)
+    def get(self, day):
+        """Get a page of the employees with a record on a day (YYYY-MM-DD), e.g. everyone absent, with their status."""
+        args = calendar_day_parser.parse_args()
+        try:
+            day = attendance_date(day)
+        except ValueError:
+            return {'message': 'Day must be a date in YYYY-MM-DD format'}, 400
+        query = db.session.query(AttendanceMonthly.employee_id, AttendanceMonthly.present_days).filter(*recorded_on(day, args['status']))
+        try:
+            rows, next_cursor = paginate(query, args, {'id': AttendanceMonthly.employee_id})
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        bit = day_bit(day)
+        return [
+            {'employee_id': r.employee_id, 'status': 'Present' if r.present_days & bit else 'Absent'} for r in rows
+        ], 200, page_headers(next_cursor)
+
+
+# --- Routes for Payroll aggregates ---
+@api_ns.route('/payroll/summary')
+class PayrollSummaryResource(Resource):
+    """Resource for salary totals, averages and headcounts computed in the database."""
+
+    @api_ns.expect(payroll_summary_parser)
+    @cached('payroll', 'PAYROLL_CACHE_TTL')
+    def get(self):
+        """Get salary total, average and headcount grouped by role, status or month of creation."""
+        args = payroll_summary_parser.parse_args()
+        status = args['status'] or (None if args['group_by'] == 'status' else 'Active')
+
+        if args['group_by'] == 'role':
+            group = Employee.role_id
+        elif args['group_by'] == 'status':
+            group = Salary.status
+        else:
+            group = extract('year', Salary.created_at) * 100 + extract('month', Salary.created_at)
+
+        stmt = select(
+            group.label('group'),
+            func.sum(Salary.amount).label('total'),
+            func.avg(Salary.amount).label('average'),
+            func.count(func.distinct(Salary.employee_id)).label('headcount'),
+        ).group_by(group).order_by(group)
+        if args['group_by'] == 'role':
+            stmt = stmt.join(Employee, Employee.id == Salary.employee_id)
+        if status:
+            stmt = stmt.where(Salary.status == status)
+
+        def label(group):
+            if args['group_by'] == 'role':
+                return roles.name(group)
+            if args['group_by'] == 'month' and group:
+                return format_period(group)
+            return group
+
+        groups = [
+            {
+                args['group_by']: label(r.group),
+                'total': float(r.total or 0),
+                'average': float(r.average or 0),
+                'headcount': r.headcount,
+            } for r in db.session.execute(stmt)
+        ]
+        if args['group_by'] == 'role':
+            # Grouped on the role key; listed by name as before
+            groups.sort(key=lambda g: g['role'] or '')
+        return groups, 200
+
+
 # --- Routes for Country ---
 @api_ns.route('/countries')
 class AllCountryResource(Resource):
     """Resource for managing countries."""
 
+    @api_ns.expect(list_parser)
+    @cached('countries')
     def get(self):
-        """Get all countries."""
-        countries = db.session.query(Country).all()
-        return [{'id': c.id, 'country_name': c.country_name} for c in countries], 200
+        """Get a page of countries."""
+        args = list_parser.parse_args()
+        try:
+            fields = country_serializer.parse_fields(args['fields'])
+            countries, next_cursor = paginate(projected(country_serializer, fields, args, COUNTRY_SORTS), args, COUNTRY_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [country_serializer.dump(c, fields) for c in countries], 200, page_headers(next_cursor)
 
-    @api.expect(post_country_parser)
+    @api_ns.expect(post_country_parser)
     def post(self):
         """Create a new country."""
         args = post_country_parser.parse_args()
-        new_country = Country(country_name=args['country_name'])
+        new_country = Country(name=args['country_name'])
         db.session.add(new_country)
         db.session.commit()
         return {'message': 'Success'}, 201
@@ -469,21 +1406,22 @@ class AllCountryResource(Resource):
 class CountryResource(Resource):
     """Resource for retrieving, updating, and deleting a specific country."""
 
+    @cached('countries')
     def get(self, id):
         """Get a specific country by ID."""
         country = db.session.query(Country).filter(Country.id == id).first()
         if country:
-            return {'id': country.id, 'country_name': country.country_name}, 200
+            return country_serializer.dump(country), 200
         return {'message': 'Country not found'}, 404
 
-    @api.expect(put_country_parser)
+    @api_ns.expect(put_country_parser)
     def put(self, id):
         """Update a country by ID."""
         args = put_country_parser.parse_args()
         country = db.session.query(Country).filter(Country.id == id).first()
 
         if country:
-            country.country_name = args['country_name']
+            country.name = args['country_name']
             db.session.commit()
             return {'message': 'Success'}, 200
         return {'message': 'Country not found'}, 404
@@ -500,9 +1438,210 @@ class CountryResource(Resource):
 
 
 
+# --- Routes for Gender ---
+@api_ns.route('/genders')
+class AllGenderResource(Resource):
+    """Resource for listing genders."""
+
+    @api_ns.expect(list_parser)
+    @cached('genders')
+    def get(self):
+        """Get a page of genders."""
+        args = list_parser.parse_args()
+        try:
+            fields = gender_serializer.parse_fields(args['fields'])
+            genders, next_cursor = paginate(projected(gender_serializer, fields, args, GENDER_SORTS), args, GENDER_SORTS)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        return [gender_serializer.dump(g, fields) for g in genders], 200, page_headers(next_cursor)
+
+
+@api_ns.route('/genders/<int:id>')
+class GenderResource(Resource):
+    """Resource for retrieving a specific gender."""
+
+    @cached('genders')
+    def get(self, id):
+        """Get a specific gender by ID."""
+        gender = db.session.query(Gender).filter(Gender.id == id).first()
+        if gender:
+            return gender_serializer.dump(gender), 200
+        return {'message': 'Gender not found'}, 404
+
+
+# --- Routes for report jobs ---
+def report_statement(args):
+    """The statement, field names and format of the report requested by the query string."""
+    if args['report'] == 'salaries':
+        report_args = report_salary_parser.parse_args()
+        source, serializer, criteria = Salary, salary_serializer, salary_filters(report_args)
+    else:
+        report_args = report_attendance_parser.parse_args()
+        source, serializer = attendance_source(report_args)
+        criteria = attendance_filters(report_args, source)
+    fields = serializer.parse_fields(report_args['fields'])
+    stmt = select(*serializer.columns(fields)).where(*criteria).order_by(source.id)
+    return stmt, fields, report_args['format']
+
+
+def report_body(job):
+    """The API representation of a job, with its download URL once completed."""
+    body = job.dump()
+    if job.status == 'completed':
+        body['download'] = url_for('api_report_download_resource', id=job.id)
+    return body
+
+
+@api_ns.route('/reports')
+class ReportsResource(Resource):
+    """Resource for starting report jobs."""
+
+    @api_ns.expect(report_parser, report_salary_parser)
+    def post(self):
+        """Start a salary or attendance report in the background; filters are those of the matching export."""
+        args = report_parser.parse_args()
+        try:
+            stmt, fields, fmt = report_statement(args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        job = report_jobs.submit(args['report'], stmt, fields, fmt, args['compression'])
+        if job is None:
+            return {'message': 'Too many reports in progress, retry later'}, 503, {'Retry-After': '30'}
+        return report_body(job), 202, {'Location': url_for('api_report_resource', id=job.id)}
+
+
+@api_ns.route('/reports/<string:id>')
+class ReportResource(Resource):
+    """Resource for polling and cancelling a report job."""
+
+    def get(self, id):
+        """Get the status and progress of a report job."""
+        job = report_jobs.get(id)
+        if job is None:
+            return {'message': 'Report not found'}, 404
+        return report_body(job), 200
+
+    def delete(self, id):
+        """Cancel a queued or running report, or delete a finished one and its file."""
+        job = report_jobs.get(id)
+        if job is None:
+            return {'message': 'Report not found'}, 404
+        if job.finished:
+            report_jobs.remove(job)
+            return {'message': 'Report deleted'}, 200
+        report_jobs.cancel(job)
+        return report_body(job), 202
+
+
+@api_ns.route('/reports/<string:id>/download')
+class ReportDownloadResource(Resource):
+    """Resource for downloading a finished report."""
+
+    def get(self, id):
+        """Download the file of a completed report."""
+        job = report_jobs.get(id)
+        if job is None:
+            return {'message': 'Report not found'}, 404
+        if job.status != 'completed':
+            return {'message': f"Report is {job.status}"}, 409
+        mimetype = 'application/gzip' if job.compression == 'gzip' else EXPORT_FORMATS[job.format]
+        return send_file(job.path, mimetype=mimetype, as_attachment=True, download_name=job.filename)
+
+
+# --- Routes for the response cache ---
+@api_ns.route('/cache/stats')
+class CacheStatsResource(Resource):
+    """Resource for inspecting the response cache."""
+
+    def get(self):
+        """Get the hit, miss and invalidation counters of each cached table."""
+        return response_cache.stats, 200
+
+
 # Similar updates are needed for Salary, Attendance, and Country resources to match the new database schema (based on updated fields)
 
+# --- CLI commands ---
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the tables that do not exist yet and the allowed genders."""
+    db.create_all()
+    # Employees reference genders by key, so every allowed gender needs a row
+    existing = set(db.session.scalars(select(Gender.name)))
+    db.session.add_all(Gender(name=name) for name in ALLOWED_GENDERS if name not in existing)
+    db.session.commit()
+    click.echo('Created missing tables')
+
+
+@click.command('rebuild-attendance-rollups')
+@with_appcontext
+def rebuild_attendance_rollups_command():
+    """Rebuild the monthly attendance rollups from the attendance table and its archive."""
+    processed = rebuild_rollups()
+    click.echo(f'Rebuilt attendance rollups for {processed} employees')
+
+
+@click.command('archive-attendances')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), help='Archive records dated before this day (default: ATTENDANCE_ARCHIVE_AFTER_DAYS ago)')
+@click.option('--batch-size', type=click.IntRange(1), help='Records moved per transaction (default: ATTENDANCE_ARCHIVE_BATCH_SIZE)')
+@with_appcontext
+def archive_attendances_command(before, batch_size):
+    """Move old attendance records into the archive table."""
+    config = current_app.config
+    before = before.date() if before else archive_cutoff(config['ATTENDANCE_ARCHIVE_AFTER_DAYS'])
+    moved = archive_attendances(before, batch_size or config['ATTENDANCE_ARCHIVE_BATCH_SIZE'])
+    click.echo(f'Archived {moved} attendance records dated before {before.isoformat()}')
+
+
+# --- Application factory ---
+def create_app(config=None):
+    """
+    Create and configure the application.
+
+    Nothing here touches the database: engines connect on first use, and the
+    schema is managed by the `init-db` command or the SQL migrations rather
+    than at startup, so worker boot does no database I/O.
+    """
+    app = Flask(__name__)
+
+    # Load configuration
+    app.config.from_object(config or Config())
+
+    # Initialize API
+    api = Api(version='1.0', title='Employee Management API', description='API for managing employees and related data')
+    api.add_namespace(api_ns)
+    api.representation('application/json')(output_json)
+    api.init_app(app)
+
+    # Initialize database
+    db.init_app(app)
+    routing.init_app(app)
+
+    # Initialize request and SQL instrumentation
+    metrics.init_app(app)
+
+    # Initialize response compression
+    compression.init_app(app)
+
+    # Initialize the response cache of the reference tables
+    response_cache.init_app(app)
+
+    # Initialize the attendance check-in write buffer
+    checkin_buffer.init_app(app, 'CHECKIN_BUFFER')
+
+    # Initialize the background report jobs
+    report_jobs.init_app(app)
+
+    # Initialize the in-memory employee search index
+    search_index.init_app(app)
+
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_attendance_rollups_command)
+    app.cli.add_command(archive_attendances_command)
+    return app
+
+
 # --- Run the Flask Application ---
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=True)
-
+    app = create_app()
+    app.run(host='127.0.0.1', port=5000, debug=app.config['DEBUG'])
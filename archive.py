@@ -0,0 +1,76 @@
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import delete, exists, func, insert, select, tuple_
+
+from models import db, Attendance, AttendanceArchive
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from Attendance to AttendanceArchive, in the same order
+_COLUMNS = ('id', 'employee_id', 'date', 'status', 'created_at', 'updated_at')
+
+
+def archive_cutoff(days, today=None):
+    """The first day kept in the attendance table when records older than `days` days are archived."""
+    return (today or date.today()) - timedelta(days=days)
+
+
+def replace_archived(days):
+    """
+    Delete the archived records of the given (employee_id, date) pairs,
+    inside the caller's transaction. Attendance write paths call this for
+    the days they write, so a record written for an archived day replaces
+    the archived one instead of sitting next to it.
+    """
+    days = set(days)
+    if days:
+        db.session.execute(delete(AttendanceArchive).where(
+            tuple_(AttendanceArchive.employee_id, AttendanceArchive.date).in_(days)
+        ))
+
+
+def archive_attendances(before, batch_size=5000):
+    """
+    Move the attendance records dated before `before` into the archive
+    table, one transaction per batch, and return the number moved.
+
+    Each batch is read oldest first from the Date index, copied with one
+    INSERT ... SELECT and deleted by primary key, so the attendance table
+    stays small without long-running locks. Records keep their IDs and
+    timestamps and no tombstones are written: they are still readable with
+    `include_archived`, and the rollups already cover both tables.
+
+    Keeping IDs relies on the attendance table never handing an archived
+    ID out again: SQLite creates it with AUTOINCREMENT, and MySQL needs 8.0
+    or later, which keeps AUTO_INCREMENT across restarts. Records whose ID
+    is already taken in the archive are skipped and stay where they are.
+    """
+    moved = 0
+    unarchived = [Attendance.date < before, ~exists().where(AttendanceArchive.id == Attendance.id)]
+    while True:
+        rows = db.session.execute(
+            select(Attendance.id).where(*unarchived).order_by(Attendance.date, Attendance.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        # Archived copies of days written again before writes replaced them
+        db.session.execute(delete(AttendanceArchive).where(
+            tuple_(AttendanceArchive.employee_id, AttendanceArchive.date).in_(
+                select(Attendance.employee_id, Attendance.date).where(Attendance.id.in_(ids))
+            )
+        ))
+        db.session.execute(insert(AttendanceArchive).from_select(
+            [getattr(AttendanceArchive, name) for name in _COLUMNS],
+            select(*(getattr(Attendance, name) for name in _COLUMNS)).where(Attendance.id.in_(ids)),
+        ))
+        db.session.execute(delete(Attendance).where(Attendance.id.in_(ids)))
+        db.session.commit()
+        moved += len(rows)
+
+    skipped = db.session.scalar(select(func.count()).select_from(Attendance).where(Attendance.date < before))
+    if skipped:
+        logger.warning('Left %d attendance records dated before %s whose IDs are already archived', skipped, before)
+    return moved
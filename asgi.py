@@ -0,0 +1,210 @@
+"""
+ASGI entry point serving the API on an async SQLAlchemy engine:
+
+    uvicorn --factory asgi:create_asgi_app --workers 4
+
+The collection and employee reads, which make up most of the traffic, run
+as coroutines on an async engine (aiomysql for MySQL, aiosqlite for
+SQLite), so a process keeps many queries in flight without a thread for
+each. They reuse the resources' parsers, filters, serializers, ETags and
+pagination inside a Flask request context, so their responses are those of
+the WSGI app. Every other request, and reads with options only the sync
+code implements (include, updated_since), is handed to the Flask app on a
+pool of ASYNC_WSGI_WORKERS threads.
+
+Needs the a2wsgi and aiomysql (or aiosqlite) packages and an ASGI server.
+"""
+from a2wsgi import WSGIMiddleware
+from flask import request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from werkzeug.test import EnvironBuilder
+
+from app import (
+    ATTENDANCE_SORTS, EMPLOYEE_SORTS, SALARY_SORTS, attendance_filters, attendance_source, create_app,
+    employee_filters, employee_serializer, list_attendance_parser, list_employee_parser, list_salary_parser,
+    salary_filters, salary_serializer,
+)
+from cache import collection_validator, etag_headers
+from lookups import genders, preloaded, roles
+from models import Employee, Salary
+from pagination import page_headers, page_query, page_result, resolve_sort
+from serializers import output_json
+
+# Async drivers replacing the sync ones of SQLALCHEMY_DATABASE_URI
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'mysql+pymysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_url(uri):
+    """The URL of `uri`'s database through its async driver."""
+    scheme, sep, rest = uri.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+async def _fresh_lookups(session, args=None, rows=()):
+    """
+    Reload the role and gender maps on the async engine when they have
+    expired or lack a name filtered on in `args` or a key of `rows`, which
+    the sync code handlers run, under lookups.preloaded(), would otherwise
+    reload through the sync session on the event loop.
+    """
+    for field, lookup in (('role', roles), ('gender', genders)):
+        names = [args.get(field)] if args else []
+        ids = [getattr(row, f'{field}_id', None) for row in rows]
+        if lookup.needs_load(names, ids):
+            version = lookup.version
+            lookup.store((await session.execute(lookup.statement())).all(), version)
+
+
+async def _collection(session, args, serializer, source, sorts, criteria, *extra, coded=False):
+    """
+    A page of a collection as the sync resources return it: body, status
+    and headers. With `coded` the lookups are made to cover the page's
+    keys before it is serialized.
+    """
+    fields = serializer.parse_fields(args['fields'])
+    headers, not_modified = etag_headers((await session.execute(collection_validator(source, criteria, args, sorts))).all(), *extra)
+    if not_modified:
+        return not_modified
+    column, _ = resolve_sort(args.get('sort'), sorts)
+    stmt, keys = page_query(select(*serializer.columns(fields, sorts['id'], column)).where(*criteria), args, sorts)
+    rows, next_cursor = page_result((await session.execute(stmt)).all(), keys, args)
+    if coded:
+        await _fresh_lookups(session, rows=rows)
+    return [serializer.dump(row, fields) for row in rows], 200, {**headers, **page_headers(next_cursor)}
+
+
+async def list_employees(session):
+    args = list_employee_parser.parse_args()
+    await _fresh_lookups(session, args)
+    return await _collection(session, args, employee_serializer, Employee, EMPLOYEE_SORTS, employee_filters(args),
+                             roles.digest(), genders.digest(), coded=True)
+
+
+async def get_employee(session, id):
+    employee = (await session.execute(select(Employee).where(Employee.id == id))).scalar_one_or_none()
+    await _fresh_lookups(session, rows=[employee] if employee else [])
+    if employee:
+        return employee_serializer.dump(employee), 200
+    return {'message': 'Employee not found'}, 404
+
+
+async def list_salaries(session):
+    args = list_salary_parser.parse_args()
+    return await _collection(session, args, salary_serializer, Salary, SALARY_SORTS, salary_filters(args))
+
+
+async def list_attendances(session):
+    args = list_attendance_parser.parse_args()
+    source, serializer = attendance_source(args)
+    sorts = {name: getattr(source, column.key) for name, column in ATTENDANCE_SORTS.items()}
+    return await _collection(session, args, serializer, source, sorts, attendance_filters(args, source))
+
+
+# GET routes served natively, with the query arguments that send them to the sync app instead
+ROUTES = Map([
+    Rule('/api/employees', endpoint=(list_employees, frozenset({'include', 'updated_since'}))),
+    Rule('/api/employees/<int:id>', endpoint=(get_employee, frozenset({'include'}))),
+    Rule('/api/salaries', endpoint=(list_salaries, frozenset({'updated_since'}))),
+    Rule('/api/attendances', endpoint=(list_attendances, frozenset({'updated_since'}))),
+], strict_slashes=False)
+
+
+def _environ(scope):
+    """A WSGI environ for an ASGI HTTP scope, enough for a Flask request context."""
+    headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+    server = scope.get('server') or ('localhost', None)
+    host = dict((name.lower(), value) for name, value in headers).get('host') or server[0]
+    builder = EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}",
+        query_string=scope['query_string'].decode('latin-1'),
+        method=scope['method'],
+        headers=headers,
+        environ_overrides={'REMOTE_ADDR': scope['client'][0]} if scope.get('client') else None,
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+class AsyncApp:
+    """ASGI application serving ROUTES on the async engine and everything else through the Flask app."""
+
+    def __init__(self, flask_app, engine):
+        self.flask_app = flask_app
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASYNC_WSGI_WORKERS', 10))
+        self.urls = ROUTES.bind('localhost')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            try:
+                (handler, sync_only), values = self.urls.match(scope['path'], method='GET')
+            except HTTPException:
+                handler = None
+            if handler is not None:
+                response = await self._dispatch(scope, handler, sync_only, values)
+                if response is not None:
+                    return await self._send(response, send)
+        await self.wsgi(scope, receive, send)
+
+    async def _dispatch(self, scope, handler, sync_only, values):
+        """Run `handler` in a request context; None when the sync app has to serve the request."""
+        with self.flask_app.request_context(_environ(scope)):
+            if sync_only & request.args.keys():
+                return None
+            # The app's before_request hooks (instrumentation) see the request as usual
+            response = self.flask_app.preprocess_request()
+            if response is None:
+                try:
+                    # The handlers load the lookups on the async engine; the sync code they run must not
+                    with preloaded():
+                        async with self.sessions() as session:
+                            rv = await handler(session, **values)
+                except ValueError as e:
+                    rv = {'message': str(e)}, 400
+                except HTTPException as e:
+                    # Parser errors carry the same body as in the sync resources
+                    rv = getattr(e, 'data', None) or {'message': e.description}, e.code
+                response = rv if not isinstance(rv, tuple) else output_json(*rv)
+            return self.flask_app.process_response(response)
+
+    async def _send(self, response, send):
+        body = response.get_data()
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config=None):
+    """
+    Create the ASGI application around `create_app(config)`.
+
+    The async engine reads ASYNC_DATABASE_URL, by default the primary
+    database through its async driver, with the same engine options (pool
+    size, timeouts) as the sync one.
+    """
+    flask_app = create_app(config)
+    uri = flask_app.config.get('ASYNC_DATABASE_URL') or async_url(flask_app.config['SQLALCHEMY_DATABASE_URI'])
+    engine = create_async_engine(uri, **flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    return AsyncApp(flask_app, engine)
@@ -0,0 +1,29 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.path.join(ROOT, 'bench', 'bench.db')
+
+
+def load_config(db_path, **settings):
+    """
+    The application config for the SQLite file at `db_path`.
+
+    The configuration is read from the environment, so the database URL and
+    any extra settings are exported before it is created.
+    """
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(db_path)}'
+    for name, value in settings.items():
+        os.environ[name] = str(value)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from config import Config
+    return Config()
+
+
+def load_app(db_path, **settings):
+    """Create the application against the SQLite file at `db_path` (see load_config)."""
+    config = load_config(db_path, **settings)
+    from app import create_app
+    return create_app(config)
@@ -0,0 +1,200 @@
+"""
+Compare the sync (WSGI) and async (ASGI, asgi.py) serving modes on the
+reads the async mode serves natively, at increasing concurrency.
+
+The sync mode gets one thread per in-flight request, as threaded WSGI
+workers do; the async mode runs every request as a coroutine on a single
+event loop. Both run in-process against the SQLite file seeded by
+bench/seed.py. SQLite answers in microseconds where MySQL takes a network
+round trip, so --latency-ms adds that wait to every statement, on the
+thread executing it, to stand in for an I/O-bound database. aiosqlite
+runs each connection on a thread of its own, so unlike aiomysql the
+stand-in does not free the async mode of threads altogether. Needs the
+aiosqlite and a2wsgi packages.
+
+    python bench/modes.py --concurrency 8,64,256 --latency-ms 2 --output modes.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from common import DEFAULT_DB, load_config
+from run import git_revision, summarize
+
+
+def read_mix(employees):
+    """The natively served reads as (name, weight, path factory) entries."""
+    def employee(rng):
+        return rng.randint(1, employees)
+
+    return [
+        ('list_employees', 30, lambda rng: '/api/employees?limit=100&status=Active'),
+        ('get_employee', 30, lambda rng: f'/api/employees/{employee(rng)}'),
+        ('list_attendances', 25, lambda rng: f'/api/attendances?employee_id={employee(rng)}&limit=100'),
+        ('list_salaries', 15, lambda rng: f'/api/salaries?employee_id={employee(rng)}'),
+    ]
+
+
+def requests_for(mix, total, seed):
+    """`total` reproducible (name, path) pairs drawn from the mix."""
+    rng = random.Random(seed)
+    names, weights = [entry[0] for entry in mix], [entry[1] for entry in mix]
+    paths = {entry[0]: entry[2] for entry in mix}
+    return [(name, paths[name](rng)) for name in rng.choices(names, weights, k=total)]
+
+
+def slow_connection(latency):
+    """A sqlite3 connection class whose statements first wait `latency` seconds, like a network round trip."""
+    class SlowCursor(sqlite3.Cursor):
+        def execute(self, *args):
+            time.sleep(latency)
+            return super().execute(*args)
+
+        def executemany(self, *args):
+            time.sleep(latency)
+            return super().executemany(*args)
+
+    class SlowConnection(sqlite3.Connection):
+        def cursor(self, factory=SlowCursor):
+            return super().cursor(factory)
+
+    return SlowConnection
+
+
+def run_sync(app, requests, concurrency):
+    """Serve the requests through the WSGI app from `concurrency` threads."""
+    samples, lock, pending = [], threading.Lock(), list(reversed(requests))
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if not pending:
+                    return
+                name, path = pending.pop()
+            started = time.perf_counter()
+            response = client.get(path)
+            latency = time.perf_counter() - started
+            with lock:
+                samples.append({'name': name, 'status': response.status_code, 'latency': latency, 'queries': None})
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+async def _asgi_get(app, path):
+    """Issue a GET to an ASGI app in-process; returns the response status."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _run_async(app, requests, concurrency):
+    samples, pending = [], list(reversed(requests))
+
+    async def worker():
+        while pending:
+            name, path = pending.pop()
+            started = time.perf_counter()
+            status = await _asgi_get(app, path)
+            samples.append({'name': name, 'status': status, 'latency': time.perf_counter() - started, 'queries': None})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await app.engine.dispose()
+    return samples, elapsed
+
+
+def run_async(app, requests, concurrency):
+    """Serve the requests through the ASGI app from `concurrency` coroutines on one event loop."""
+    return asyncio.run(_run_async(app, requests, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file seeded by bench/seed.py')
+    parser.add_argument('--requests', type=int, default=2000, help='Measured requests per mode and concurrency level')
+    parser.add_argument('--concurrency', default='8,64,256', help='Comma-separated numbers of requests in flight')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='Simulated database round trip per statement')
+    parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests before each run (at least two per request in flight)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed of the request mix')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    # Enough connections for every request in flight, so neither mode queues on the pool
+    config = load_config(args.db, DB_POOL_SIZE=max(levels), DB_MAX_OVERFLOW=0, METRICS_ENABLED=0, COMPRESSION_ENABLED=0)
+    config.SQLALCHEMY_ENGINE_OPTIONS['connect_args']['factory'] = slow_connection(args.latency_ms / 1000)
+    config.ASYNC_WSGI_WORKERS = max(levels)
+    from sqlalchemy import func, select
+    from app import create_app
+    from asgi import create_asgi_app
+    from models import Employee, db
+
+    sync_app = create_app(config)
+    with sync_app.app_context():
+        employees = db.session.scalar(select(func.count(Employee.id)))
+    if not employees:
+        parser.error(f'{args.db} has no employees; run bench/seed.py first')
+    mix = read_mix(employees)
+
+    results = []
+    for concurrency in levels:
+        # Every in-flight slot warms up, so the pools are full before measuring
+        warmup = max(args.warmup, 2 * concurrency)
+        requests = requests_for(mix, warmup + args.requests, args.seed)
+        for mode, runner, make_app in (('sync', run_sync, lambda: sync_app), ('async', run_async, lambda: create_asgi_app(config))):
+            app = make_app()
+            runner(app, requests[:warmup], concurrency)
+            samples, elapsed = runner(app, requests[warmup:], concurrency)
+            stats = summarize(samples, elapsed)
+            results.append({'mode': mode, 'concurrency': concurrency, **stats})
+            latency = stats['latency_ms']
+            print(f"{mode:<6} concurrency {concurrency:>4}: {stats['throughput_rps']:>8} rps, "
+                  f"p50 {latency['p50']} ms, p99 {latency['p99']} ms, {stats['errors']} errors", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'database': args.db,
+                    'employees': employees,
+                    'requests': args.requests,
+                    'latency_ms': args.latency_ms,
+                },
+                'results': results,
+            }, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
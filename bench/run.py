@@ -0,0 +1,200 @@
+"""
+Drive a mixed read/write workload against the API and report throughput,
+latency percentiles and SQL statements per request for each endpoint.
+
+Requests go through the Flask test client, in-process, so the numbers
+measure the application and the database rather than an HTTP server.
+Run bench/seed.py first; results are written as JSON so runs can be
+compared before and after a change:
+
+    python bench/run.py --requests 5000 --concurrency 4 --output before.json
+    python bench/run.py --requests 5000 --concurrency 4 --baseline before.json
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from common import DEFAULT_DB, ROOT, load_app
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+
+
+def workload(employees, days):
+    """
+    The request mix as (name, weight, method, path factory, body factory)
+    entries; factories take a random.Random so runs are reproducible.
+    """
+    def employee(rng):
+        return rng.randint(1, employees)
+
+    def day(rng):
+        return days[rng.randrange(len(days))]
+
+    def month(rng):
+        return day(rng).strftime('%Y-%m')
+
+    return [
+        ('list_employees', 20, 'GET', lambda rng: f'/api/employees?limit=100&status=Active&role={rng.choice(["Engineer", "Manager", "Sales"])}', None),
+        ('list_employees_fields', 10, 'GET', lambda rng: '/api/employees?limit=100&fields=id,first_name,last_name,role', None),
+        ('get_employee', 20, 'GET', lambda rng: f'/api/employees/{employee(rng)}', None),
+        ('get_employee_include', 10, 'GET', lambda rng: f'/api/employees/{employee(rng)}?include=salaries,attendances&attendances_limit=30', None),
+        ('list_attendances', 10, 'GET', lambda rng: f'/api/attendances?employee_id={employee(rng)}&limit=100', None),
+        ('list_salaries', 5, 'GET', lambda rng: f'/api/salaries?employee_id={employee(rng)}', None),
+        ('attendance_summary', 5, 'GET', lambda rng: f'/api/employees/{employee(rng)}/attendance-summary?from={month(rng)}', None),
+        ('payroll_summary', 5, 'GET', lambda rng: f'/api/payroll/summary?group_by={rng.choice(["role", "status"])}', None),
+        ('reference_tables', 5, 'GET', lambda rng: f'/api/{rng.choice(["roles", "genders", "positions", "countries"])}', None),
+        ('upsert_attendance', 10, 'PUT', lambda rng: f'/api/employees/{employee(rng)}/attendance/{day(rng).isoformat()}',
+         lambda rng: {'status': rng.choice(['Present', 'Absent'])}),
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of already sorted `values`."""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency (ms) and queries per request of a list of samples."""
+    latencies = sorted(s['latency'] for s in samples)
+    queries = [s['queries'] for s in samples if s['queries'] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if s['status'] >= 400),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            **{f'p{p}': round(percentile(latencies, p) * 1000, 2) if latencies else None for p in (50, 95, 99)},
+            'max': round(latencies[-1] * 1000, 2) if latencies else None,
+        },
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run(app, mix, total, concurrency, seed, warmup):
+    """Issue `total` requests from `concurrency` threads; returns (samples, elapsed)."""
+    names = [entry[0] for entry in mix]
+    weights = [entry[1] for entry in mix]
+    by_name = {entry[0]: entry for entry in mix}
+    samples, lock = [], threading.Lock()
+    per_thread = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    def worker(number, count):
+        rng = random.Random(seed * 1000 + number)
+        client = app.test_client()
+        for i in range(warmup + count):
+            name = rng.choices(names, weights)[0]
+            _, _, method, path, body = by_name[name]
+            url, payload = path(rng), body(rng) if body else None
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=payload)
+            latency = time.perf_counter() - started
+            if i < warmup:
+                continue
+            match = SERVER_TIMING.search(response.headers.get('Server-Timing', ''))
+            with lock:
+                samples.append({
+                    'name': name, 'status': response.status_code, 'latency': latency,
+                    'queries': int(match.group(1)) if match else None,
+                })
+
+    threads = [threading.Thread(target=worker, args=(n, count)) for n, count in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, baseline=None):
+    def delta(name, key, value):
+        if not baseline or value is None:
+            return ''
+        old = baseline['endpoints'].get(name) if name != 'overall' else baseline['overall']
+        old = old and (old['latency_ms'][key] if key != 'throughput_rps' else old[key])
+        if not old:
+            return ''
+        return f' ({(value - old) / old * 100:+.0f}%)'
+
+    print(f"{'endpoint':<24}{'reqs':>7}{'errs':>6}{'rps':>16}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'queries':>9}")
+    rows = sorted(report['endpoints'].items()) + [('overall', report['overall'])]
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        print(f"{name:<24}{stats['requests']:>7}{stats['errors']:>6}"
+              f"{(str(stats['throughput_rps']) + delta(name, 'throughput_rps', stats['throughput_rps'])):>16}"
+              + ''.join(f"{(str(latency[p]) + delta(name, p, latency[p])):>18}" for p in ('p50', 'p95', 'p99'))
+              + f"{stats['queries_per_request'] if stats['queries_per_request'] is not None else '-':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file seeded by bench/seed.py')
+    parser.add_argument('--requests', type=int, default=2000, help='Measured requests, across all threads')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per thread before measuring')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed of the request mix')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Previous JSON results to compare against')
+    args = parser.parse_args()
+
+    # Slow-request logging is silenced so it does not skew the measurements
+    app = load_app(args.db, SERVER_TIMING_HEADER=1, SLOW_QUERY_MS=10**6, SLOW_REQUEST_MS=10**6)
+    from sqlalchemy import func, select
+    from models import Attendance, Employee, db
+    with app.app_context():
+        employees = db.session.scalar(select(func.count(Employee.id)))
+        first, last = db.session.execute(select(func.min(Attendance.date), func.max(Attendance.date))).one()
+    if not employees:
+        parser.error(f'{args.db} has no employees; run bench/seed.py first')
+    first, last = first or date.today(), last or date.today()
+    days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+    mix = workload(employees, days)
+    samples, elapsed = run(app, mix, args.requests, args.concurrency, args.seed, args.warmup)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': args.db,
+            'employees': employees,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'elapsed_s': round(elapsed, 3),
+        },
+        'overall': summarize(samples, elapsed),
+        'endpoints': {name: summarize([s for s in samples if s['name'] == name], elapsed) for name, *_ in mix},
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
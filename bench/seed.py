@@ -0,0 +1,129 @@
+"""
+Seed a SQLite database with realistic data volumes for the benchmarks.
+
+At scale 1.0 this creates 100k employees, about 200k salaries and 10M
+attendance rows (100 working days per employee); --scale shrinks or grows
+every table proportionally.
+
+    python bench/seed.py --scale 0.01 --db bench/bench.db
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from common import DEFAULT_DB, load_app
+
+EMPLOYEES_AT_SCALE_1 = 100_000
+ATTENDANCE_DAYS = 100  # Per employee: 100k employees x 100 days = 10M rows at scale 1
+CHUNK_SIZE = 10_000
+
+FIRST_NAMES = ['Sokha', 'Dara', 'Vanna', 'Maly', 'Chenda', 'Rithy', 'Sophea', 'Bopha', 'Nimol', 'Kosal', 'Anna', 'John', 'Maria', 'Wei', 'Omar', 'Priya']
+LAST_NAMES = ['Chan', 'Sok', 'Keo', 'Lim', 'Heng', 'Meas', 'Pich', 'Ly', 'Nguyen', 'Smith', 'Garcia', 'Khan', 'Tan', 'Patel', 'Kim', 'Lee']
+ROLES = ['Engineer', 'Senior Engineer', 'Manager', 'Accountant', 'HR Officer', 'Sales', 'Support', 'Designer', 'Analyst', 'Intern', 'Director', 'Cashier']
+GENDERS = ['Male', 'Female', 'Other']
+
+
+def working_days(start, count):
+    """The first `count` weekdays from `start`."""
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def seed(db, scale, seed_value):
+    from sqlalchemy import insert, text
+    from models import Attendance, Employee, Gender, Role, Salary
+    from rollups import rebuild
+
+    rng = random.Random(seed_value)
+    employees = max(1, int(EMPLOYEES_AT_SCALE_1 * scale))
+    now = datetime.utcnow()
+
+    db.drop_all()
+    db.create_all()
+    db.session.execute(text('PRAGMA journal_mode=WAL'))
+    db.session.execute(text('PRAGMA synchronous=OFF'))
+
+    db.session.execute(insert(Gender), [{'name': name} for name in GENDERS])
+    db.session.execute(insert(Role), [{'name': name, 'description': None} for name in ROLES])
+
+    def chunks(rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == CHUNK_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def employee_rows():
+        for i in range(1, employees + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield {
+                'first_name': first, 'last_name': last,
+                'email': f'{first}.{last}.{i}@example.com'.lower(),
+                'phone_number': f'+855{rng.randrange(10**8):08d}',
+                # Keys of the genders and roles inserted above, in list order
+                'gender_id': rng.randint(1, len(GENDERS)), 'role_id': rng.randint(1, len(ROLES)),
+                'status': 'Active' if rng.random() < 0.9 else 'Inactive',
+                'created_at': now, 'updated_at': now,
+            }
+
+    def salary_rows():
+        for employee_id in range(1, employees + 1):
+            for k in range(rng.choice((1, 2, 2, 3))):
+                yield {
+                    'employee_id': employee_id, 'amount': round(rng.uniform(300, 5000), 2),
+                    'status': 'Active' if k == 0 else 'Inactive', 'created_at': now, 'updated_at': now,
+                }
+
+    days = working_days(date.today() - timedelta(days=ATTENDANCE_DAYS * 7 // 5 + 7), ATTENDANCE_DAYS)
+
+    def attendance_rows():
+        for employee_id in range(1, employees + 1):
+            for day in days:
+                yield {
+                    'employee_id': employee_id, 'date': day,
+                    'status': 'Present' if rng.random() < 0.95 else 'Absent',
+                    'created_at': now, 'updated_at': now,
+                }
+
+    counts = {}
+    for name, model, rows in (('employees', Employee, employee_rows()), ('salaries', Salary, salary_rows()), ('attendances', Attendance, attendance_rows())):
+        started, total = time.perf_counter(), 0
+        for batch in chunks(rows):
+            db.session.execute(insert(model), batch)
+            total += len(batch)
+        db.session.commit()
+        counts[name] = total
+        print(f'{name}: {total} rows in {time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    rebuild()
+    print(f'attendance rollups rebuilt in {time.perf_counter() - started:.1f}s')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file to (re)create')
+    parser.add_argument('--scale', type=float, default=0.01, help='Scale factor; 1.0 = 100k employees and 10M attendance rows')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, for reproducible data')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    app = load_app(args.db)
+    from models import db
+    with app.app_context():
+        seed(db, args.scale, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure cold-start time: importing the application, creating it with
+create_app and serving the first request, each in a fresh interpreter as a
+new worker would. Database connections opened before the first request
+are counted too; there should be none.
+
+    python bench/startup.py --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import DEFAULT_DB, ROOT
+
+# Runs in the child interpreter and prints its timings as JSON
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(time.perf_counter()))
+sys.path.insert(0, {root!r})
+import app as module
+imported = time.perf_counter()
+app = module.create_app()
+created = time.perf_counter()
+boot_connections = len(connections)
+response = app.test_client().get('/api/genders')
+served = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - started) * 1000,
+    'boot_connections': boot_connections,
+    'status': response.status_code,
+}}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite file the app is configured against')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to start')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{os.path.abspath(args.db)}'}
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(root=ROOT)], env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    summary = {
+        key: {'median': round(statistics.median(r[key] for r in runs), 2), 'max': round(max(r[key] for r in runs), 2)}
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')
+    }
+    summary['boot_connections'] = max(r['boot_connections'] for r in runs)
+    for key, value in summary.items():
+        print(f'{key:<20}{value}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': runs, 'summary': summary}, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from sqlalchemy import or_, select
+
+from models import db, AttendanceMonthly
+from rollups import period_of
+
+# Longest range a calendar can cover
+MAX_CALENDAR_DAYS = 366
+
+# Characters of a calendar string, one per day
+PRESENT, ABSENT, UNRECORDED = 'P', 'A', '.'
+
+
+def day_bit(day):
+    """The bit of `day` in its month's bitmap."""
+    return 1 << (day.day - 1)
+
+
+def range_mask(first, last):
+    """The bits of the days from `first` to `last`, both in the same month."""
+    return ((1 << (last.day - first.day + 1)) - 1) << (first.day - 1)
+
+
+def months(first, last):
+    """(period, first day, last day) of each month overlapping `first`..`last`."""
+    start = first
+    while start <= last:
+        following = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        end = min(last, following - timedelta(days=1))
+        yield period_of(start), start, end
+        start = following
+
+
+def calendars(employee_ids, first, last):
+    """
+    The attendance of each employee from `first` to `last`, as a dict of
+    employee ID to (calendar string, present days, absent days).
+
+    Only the month bitmaps of the rollup table are read, one row per
+    employee-month instead of one per day, and the counts of partial months
+    are popcounts of the bitmaps masked to the requested days.
+    """
+    spans = list(months(first, last))
+    rows = db.session.execute(
+        select(AttendanceMonthly.employee_id, AttendanceMonthly.period, AttendanceMonthly.present_days, AttendanceMonthly.absent_days)
+        .where(AttendanceMonthly.employee_id.in_(employee_ids), AttendanceMonthly.period.between(spans[0][0], spans[-1][0]))
+    ).all()
+    bitmaps = {(row.employee_id, row.period): (row.present_days, row.absent_days) for row in rows}
+
+    result = {}
+    for employee_id in employee_ids:
+        days, present, absent = [], 0, 0
+        for period, start, end in spans:
+            present_days, absent_days = bitmaps.get((employee_id, period), (0, 0))
+            mask = range_mask(start, end)
+            present_days, absent_days = present_days & mask, absent_days & mask
+            present += present_days.bit_count()
+            absent += absent_days.bit_count()
+            for offset in range(start.day - 1, end.day):
+                bit = 1 << offset
+                days.append(PRESENT if present_days & bit else ABSENT if absent_days & bit else UNRECORDED)
+        result[employee_id] = (''.join(days), present, absent)
+    return result
+
+
+def recorded_on(day, status=None):
+    """
+    Criteria selecting the rollup rows of the employees with a record of
+    `status` (either status if None) on `day`, as bit tests on the month's
+    bitmaps that the Period index narrows to one month.
+    """
+    bit = day_bit(day)
+    present = AttendanceMonthly.present_days.op('&')(bit) != 0
+    absent = AttendanceMonthly.absent_days.op('&')(bit) != 0
+    tests = {'Present': present, 'Absent': absent}
+    return [AttendanceMonthly.period == period_of(day), tests[status] if status else or_(present, absent)]
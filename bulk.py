@@ -0,0 +1,129 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, exc, func, insert, select, update
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+
+from models import db
+from sync import record_deletes
+
+
+class _ItemRequest:
+    """Minimal stand-in for the Flask request so a RequestParser can parse one bulk item."""
+
+    def __init__(self, item):
+        self.item = item
+        self.values = MultiDict()
+
+    def get_json(self, silent=False):
+        return self.item
+
+
+def validate_items(parser, items):
+    """
+    Validate every item of a bulk payload with `parser`.
+
+    Returns the parsed arguments of the valid items as (index, args) pairs
+    and a results list holding an error entry for each invalid item.
+    """
+    parser = parser.copy()
+    parser.bundle_errors = True
+
+    valid, results = [], [None] * len(items)
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'status': 'error', 'errors': {'item': 'Item must be a JSON object'}}
+            continue
+        try:
+            valid.append((index, parser.parse_args(req=_ItemRequest(item))))
+        except HTTPException as e:
+            errors = getattr(e, 'data', {}).get('errors') or {'item': e.description}
+            results[index] = {'index': index, 'status': 'error', 'errors': errors}
+    return valid, results
+
+
+def reject(results, index, errors):
+    """Record a validation error for the item at `index`."""
+    results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+
+def write_chunks(rows, results, write, status='created', chunk_size=None):
+    """
+    Write `rows` (pairs of item index and column values) with one call to
+    `write` and one transaction per chunk.
+
+    A chunk that fails is rolled back and all of its items are reported as
+    failed; the other chunks are unaffected.
+    """
+    chunk_size = chunk_size or current_app.config['BULK_CHUNK_SIZE']
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            write([values for _, values in chunk])
+            db.session.commit()
+        except exc.SQLAlchemyError as e:
+            db.session.rollback()
+            result = {'status': 'error', 'errors': {'item': str(e.orig if hasattr(e, 'orig') else e)}}
+        else:
+            result = {'status': status}
+        for index, _ in chunk:
+            results[index] = {'index': index, **result}
+
+
+def insert_chunks(model, rows, results, chunk_size=None):
+    """Insert `rows` with an executemany INSERT per chunk."""
+    write_chunks(rows, results, lambda values: db.session.execute(insert(model), values), 'created', chunk_size)
+
+
+def bulk_response(results, status='created', code=201):
+    """Summarize per-item results; `code` when every item succeeded, 207 otherwise."""
+    succeeded = sum(1 for r in results if r['status'] != 'error')
+    body = {status: succeeded, 'failed': len(results) - succeeded, 'results': results}
+    return body, code if succeeded == len(results) else 207
+
+
+def payload_error(items):
+    """Return an error response for a malformed bulk payload, or None if it is usable."""
+    if not isinstance(items, list):
+        return {'message': 'Request body must be a JSON array'}, 400
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        return {'message': f'A bulk request may contain at most {max_items} items'}, 413
+    return None
+
+
+def count_where(model, criteria):
+    """Count the rows a set-based write with `criteria` would touch."""
+    return db.session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+def update_where(model, criteria, values):
+    """Update every row matching `criteria` with one UPDATE, stamping updated_at; returns the row count."""
+    stmt = update(model).where(*criteria).values(**values, updated_at=datetime.utcnow())
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+
+def delete_where(model, criteria):
+    """Delete every row matching `criteria` with one DELETE, after tombstoning them; returns the row count."""
+    record_deletes(model, criteria)
+    stmt = delete(model).where(*criteria)
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+
+def write_where(model, criteria, write, dry_run, status):
+    """
+    Respond to a set-based PATCH or DELETE: count the matching rows for a
+    dry run, otherwise run `write` and commit it as one transaction.
+    """
+    if not criteria:
+        return {'message': 'At least one filter is required'}, 400
+    if dry_run:
+        return {'matched': count_where(model, criteria), 'dry_run': True}, 200
+    try:
+        count = write()
+        db.session.commit()
+    except exc.IntegrityError as e:
+        db.session.rollback()
+        return {'message': str(e.orig)}, 409
+    return {status: count}, 200
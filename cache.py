@@ -0,0 +1,248 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from functools import wraps
+
+from flask import Response, current_app, request
+from sqlalchemy import select
+from werkzeug.utils import import_string
+
+from changes import on_commit
+from models import db
+from pagination import page_query
+from routing import read_from_primary, reads_from_replica
+
+
+class CacheBackend:
+    """
+    Interface of the stores the response cache can run on.
+
+    The in-process `MemoryCache` is the default; a shared store (e.g. Redis)
+    only needs to implement these three operations to be plugged in through
+    the CACHE_BACKEND setting.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def incr(self, key):
+        """Atomically increment the integer stored at `key` (missing keys count as 0)."""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires)
+            self._entries.move_to_end(key)
+            return value + 1
+
+
+class ResponseCache:
+    """
+    Read-through cache of GET responses, grouped in namespaces named after
+    the table they are read from.
+
+    Invalidating a namespace bumps its version, which is part of every key,
+    so stale entries are never read again and simply age out of the store.
+    It also marks the namespace as recently changed for `replica_lag`
+    seconds, during which a replica may still serve the old rows.
+    """
+
+    def __init__(self, backend=None, ttl=300, replica_lag=0):
+        self.backend = backend or MemoryCache()
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure the backend and TTL from the application config."""
+        backend = app.config.get('CACHE_BACKEND', MemoryCache)
+        if isinstance(backend, str):
+            backend = import_string(backend)
+        self.backend = backend(**app.config.get('CACHE_BACKEND_OPTIONS', {}))
+        self.ttl = app.config.get('CACHE_TTL', self.ttl)
+        # Replication is assumed caught up once writers stop sticking to the primary
+        self.replica_lag = app.config.get('DB_REPLICA_STICKY_SECONDS', self.replica_lag)
+
+    def _count(self, namespace, counter):
+        with self._lock:
+            counters = self.stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            counters[counter] += 1
+
+    def version(self, namespace):
+        return self.backend.get(f'{namespace}:version') or 0
+
+    def _key(self, namespace, key, version=None):
+        if version is None:
+            version = self.version(namespace)
+        return f'{namespace}:{version}:{key}'
+
+    def get(self, namespace, key, version=None):
+        value = self.backend.get(self._key(namespace, key, version))
+        self._count(namespace, 'misses' if value is None else 'hits')
+        return value
+
+    def set(self, namespace, key, value, ttl=None, version=None):
+        """Store `value`; pass the `version` read before computing it, so a value read across an invalidation is filed under the old one."""
+        self.backend.set(self._key(namespace, key, version), value, ttl or self.ttl)
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr(f'{namespace}:version')
+            if self.replica_lag:
+                self.backend.set(f'{namespace}:changed', True, self.replica_lag)
+            self._count(namespace, 'invalidations')
+
+    def recently_changed(self, namespace):
+        """Whether `namespace` was invalidated less than `replica_lag` seconds ago."""
+        return bool(self.replica_lag) and self.backend.get(f'{namespace}:changed') is not None
+
+
+response_cache = ResponseCache()
+
+# Namespaces handlers are cached under through @cached
+_cached_namespaces = set()
+
+
+@on_commit
+def _invalidate_changed_tables(tables):
+    """Drop the cached responses of the tables a committed transaction touched, where any are cached."""
+    response_cache.invalidate(*(tables & _cached_namespaces))
+
+
+def _not_modified(entry):
+    """Whether the request's validators show the client already has `entry`."""
+    if request.if_none_match:
+        # Weak comparison, as compressed responses carry a weakened ETag
+        return request.if_none_match.contains_weak(entry['etag'])
+    since = request.headers.get('If-Modified-Since')
+    if since:
+        try:
+            return parsedate_to_datetime(since).timestamp() >= entry['last_modified']
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached(namespace, ttl_setting=None):
+    """
+    Serve a GET handler from the response cache of `namespace`.
+
+    Successful responses are stored with an ETag and Last-Modified, and
+    requests carrying matching validators get an empty 304. Entries live for
+    CACHE_TTL seconds unless `ttl_setting` names another config key; a TTL
+    of 0 in that setting disables caching for the handler.
+
+    A miss right after the namespace changed reads from the primary, as a
+    lagging replica would fill the entry, shared by every client, with the
+    rows from before the write.
+    """
+    _cached_namespaces.add(namespace)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            ttl = current_app.config[ttl_setting] if ttl_setting else None
+            if ttl == 0:
+                return f(*args, **kwargs)
+            key = request.full_path
+            version = response_cache.version(namespace)
+            entry = response_cache.get(namespace, key, version)
+            state = 'HIT'
+            if entry is None:
+                if reads_from_replica() and response_cache.recently_changed(namespace):
+                    read_from_primary()
+                rv = f(*args, **kwargs)
+                body, code = rv[0], rv[1]
+                if code != 200:
+                    return rv
+                payload = json.dumps(body, sort_keys=True, separators=(',', ':'))
+                entry = {
+                    'body': body,
+                    'headers': rv[2] if len(rv) > 2 else {},
+                    'etag': hashlib.sha1(payload.encode()).hexdigest(),
+                    'last_modified': int(time.time()),
+                }
+                response_cache.set(namespace, key, entry, ttl, version)
+                state = 'MISS'
+
+            headers = {
+                **entry['headers'],
+                'ETag': f'"{entry["etag"]}"',
+                'Last-Modified': formatdate(entry['last_modified'], usegmt=True),
+                'X-Cache': state,
+            }
+            if _not_modified(entry):
+                return Response(status=304, headers=headers)
+            return entry['body'], 200, headers
+        return wrapper
+    return decorator
+
+
+def collection_validator(source, criteria, args, sorts):
+    """SELECT of the ID and updated_at of the rows on the requested page of `source` under `criteria`."""
+    stmt, _ = page_query(select(sorts['id'], source.updated_at).where(*criteria), args, sorts)
+    return stmt
+
+
+def collection_etag(source, criteria, args, sorts, *extra):
+    """
+    A weak ETag for a collection GET, and an empty 304 response when the
+    client's If-None-Match already has it (None otherwise).
+
+    The validator is the ID and updated_at of each row of the requested
+    keyset page of `source` under `criteria`, plus the one after it, read
+    from the same index range as the page itself, together with the
+    request's path and any `extra` values that also shape the body.
+    Inserts, updates and deletes within the page all change it, so the 304
+    is answered without reading or serializing the rows, and without
+    aggregating the rest of the collection.
+    """
+    return etag_headers(db.session.execute(collection_validator(source, criteria, args, sorts)).all(), *extra)
+
+
+def etag_headers(validator, *extra):
+    """The ETag header and 304 response of `collection_etag` for already fetched validator rows."""
+    keys = [[row_id, updated_at and updated_at.isoformat()] for row_id, updated_at in validator]
+    validator = json.dumps([request.full_path, keys, *extra], separators=(',', ':'))
+    etag = hashlib.sha1(validator.encode()).hexdigest()
+    headers = {'ETag': f'W/"{etag}"'}
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        return headers, Response(status=304, headers=headers)
+    return headers, None
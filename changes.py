@@ -0,0 +1,44 @@
+from itertools import chain
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Callbacks run with the set of table names changed by each committed transaction
+_listeners = []
+
+
+def on_commit(listener):
+    """Register `listener(tables)` to be called after every commit that changed `tables`."""
+    _listeners.append(listener)
+    return listener
+
+
+def _changed_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    """Record the tables touched by ORM unit-of-work flushes."""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        _changed_tables(session).add(inspect(obj).mapper.local_table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_statement(state):
+    """Record the tables touched by INSERT/UPDATE/DELETE statements run through the session."""
+    if state.is_insert or state.is_update or state.is_delete:
+        _changed_tables(state.session).add(state.statement.table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify(session):
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        for listener in _listeners:
+            listener(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard(session):
+    session.info.pop('changed_tables', None)
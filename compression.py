@@ -0,0 +1,58 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional; responses are gzipped without it
+    brotli = None
+
+# Only text payloads are worth compressing; files such as the gzipped reports are sent as they are
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+
+def _encoding(accepted):
+    """The best encoding the client accepts: brotli when installed, else gzip, else None."""
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_app(app):
+    """
+    Compress responses negotiated through Accept-Encoding.
+
+    Bodies smaller than COMPRESSION_MIN_SIZE bytes are not worth the CPU,
+    and streamed responses (the exports) and file downloads are left alone
+    so they keep streaming instead of being buffered here.
+    """
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = _encoding(request.accept_encodings)
+        if encoding is None or response.content_length is None or response.content_length < min_size:
+            return response
+
+        body = response.get_data()
+        if encoding == 'br':
+            response.set_data(brotli.compress(body, quality=brotli_quality))
+        else:
+            response.set_data(gzip.compress(body, compresslevel=gzip_level, mtime=0))
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity ones, so a strong validator no longer holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+from models import db
+from serializers import encode_value
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_export(stmt, fieldnames, fmt, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Yield `stmt`'s rows encoded as NDJSON or CSV, one chunk at a time.
+
+    The statement is executed with `yield_per`, which streams results from
+    a server-side cursor so only `chunk_size` rows are held in memory.
+    `progress`, if given, is called with the number of rows of each chunk
+    before it is encoded.
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fieldnames)
+        yield buffer.getvalue()
+
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        if progress is not None:
+            progress(len(rows))
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([encode_value(v) for v in row] for row in rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(
+                json.dumps(dict(zip(fieldnames, map(encode_value, row))), separators=(',', ':')) + '\n'
+                for row in rows
+            )
+
+
+def export_response(stmt, fieldnames, fmt, filename):
+    """Build a streaming response for an export of `stmt`."""
+    response = Response(stream_with_context(iter_export(stmt, fieldnames, fmt)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app
+from sqlalchemy import select
+
+from changes import on_commit
+from models import db, Gender, Role
+
+# False while the caller keeps the maps loaded itself, see preloaded()
+_may_load = ContextVar('lookups_may_load', default=True)
+
+
+class Lookup:
+    """
+    Cached name <-> ID map of a small reference table.
+
+    Employees store role and gender as integer keys while the API speaks
+    names, so every read and write translates through this map instead of
+    joining. It is reloaded after a local commit changes the table, on a
+    miss (a row added by another worker), and at least every `ttl`
+    seconds, which bounds how long a rename made elsewhere goes unseen.
+    Names and IDs a reload did not find are remembered until the next one,
+    so repeated lookups of unknown values do not reload the table each time.
+
+    Readers in other threads keep using the current map while it is
+    invalidated and reloaded; each reload replaces it whole.
+    """
+
+    def __init__(self, model, ttl=60):
+        self.model = model
+        self.ttl = ttl
+        self._ids = None
+        self._names = None
+        self._missing_names = set()
+        self._missing_ids = set()
+        self._loaded = 0.0
+        self._loaded_version = None
+        self._version = 0
+        self._changed = float('-inf')
+        self._lock = threading.Lock()
+
+    def statement(self):
+        return select(self.model.id, self.model.name).order_by(self.model.id)
+
+    @property
+    def version(self):
+        """Bumped by every invalidation; pass the value read before querying to `store`."""
+        return self._version
+
+    def _load(self):
+        version = self._version
+        # Right after a local change a lagging replica would reload the map from before it
+        recent = time.monotonic() - self._changed < current_app.config.get('DB_REPLICA_STICKY_SECONDS', 0)
+        rows = db.session.execute(self.statement(), bind_arguments={'bind': db.engine} if recent else None).all()
+        self.store(rows, version)
+
+    def store(self, rows, version):
+        """
+        Replace the map with the (id, name) rows of `statement()`, for
+        callers that query it themselves. The map stays expired if it was
+        invalidated since `version` was read, as the rows may predate that.
+        """
+        ids = {}
+        for row_id, name in rows:
+            # Names are not unique in the table; the oldest row wins
+            ids.setdefault(name, row_id)
+        with self._lock:
+            self._ids, self._names = ids, dict(rows)
+            self._missing_names, self._missing_ids = set(), set()
+            self._loaded = time.monotonic()
+            self._loaded_version = version
+
+    @property
+    def expired(self):
+        return (self._ids is None or self._loaded_version != self._version
+                or time.monotonic() - self._loaded > self.ttl)
+
+    def _fresh(self):
+        """Reload the map if it has expired; True if it did."""
+        if self.expired and _may_load.get():
+            self._load()
+            return True
+        return False
+
+    def _load_missing(self):
+        if _may_load.get():
+            self._load()
+
+    def needs_load(self, names=(), ids=()):
+        """
+        Whether the map has expired or lacks one of `names` or `ids` (None
+        skipped) that a reload may find, i.e. not already missed since the last one.
+        """
+        if self.expired:
+            return True
+        return (any(name is not None and name not in self._ids and name not in self._missing_names for name in names)
+                or any(row_id is not None and row_id not in self._names and row_id not in self._missing_ids for row_id in ids))
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._changed = time.monotonic()
+
+    def digest(self):
+        """A short hash of the map, which changes when a row is added or renamed."""
+        self._fresh()
+        return hashlib.sha1(repr(sorted(self._names.items())).encode()).hexdigest()[:16]
+
+    def id(self, name):
+        """The ID of the row called `name`, or None if there is none."""
+        loaded = self._fresh()
+        if name not in self._ids and name not in self._missing_names:
+            if not loaded:
+                self._load_missing()
+            if name not in self._ids:
+                self._missing_names.add(name)
+        return self._ids.get(name)
+
+    def name(self, row_id):
+        """The name of the row with ID `row_id` (None for a null key)."""
+        if row_id is None:
+            return None
+        loaded = self._fresh()
+        if row_id not in self._names and row_id not in self._missing_ids:
+            if not loaded:
+                self._load_missing()
+            if row_id not in self._names:
+                self._missing_ids.add(row_id)
+        return self._names.get(row_id)
+
+
+roles = Lookup(Role)
+genders = Lookup(Gender)
+
+
+@contextmanager
+def preloaded():
+    """
+    Answer from the maps as they are, without querying, inside the block;
+    for callers that load them beforehand with `needs_load` and `store`,
+    such as the async reads of asgi.py, which must not block on the sync
+    session.
+    """
+    token = _may_load.set(False)
+    try:
+        yield
+    finally:
+        _may_load.reset(token)
+
+
+@on_commit
+def _invalidate_lookups(tables):
+    """Reload the maps of the reference tables a committed transaction touched."""
+    for lookup in (roles, genders):
+        if lookup.model.__tablename__ in tables:
+            lookup.invalidate()
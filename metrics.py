@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with one series per label combination."""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values=(), amount=1):
+        with self._lock:
+            self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            series = dict(self.series)
+        for values, total in sorted(series.items()):
+            yield f'{self.name}{_format_labels(self.labels, values)} {total}'
+
+
+class Histogram:
+    """Histogram with fixed upper bounds, rendered with cumulative buckets."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, values, value):
+        with self._lock:
+            series = self.series.get(values)
+            if series is None:
+                # One slot per bucket plus +Inf, then the sum
+                series = self.series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            series = {values: list(counts) for values, counts in self.series.items()}
+        for values, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, values)} {counts[-1]}'
+            yield f'{self.name}_count{_format_labels(self.labels, values)} {cumulative}'
+
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by route, method and status.', ('route', 'method', 'status'))
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency.', LATENCY_BUCKETS, ('route', 'method'))
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'SQL statements executed per request.', QUERY_COUNT_BUCKETS, ('route', 'method'))
+REQUEST_DB_TIME = Histogram('http_request_db_duration_seconds', 'Time spent in SQL statements per request.', LATENCY_BUCKETS, ('route', 'method'))
+SLOW_QUERIES = Counter('db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.', ('route',))
+REGISTRY = (REQUESTS, REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, SLOW_QUERIES)
+
+# Slow query threshold in seconds, set from the config by init_app
+_thresholds = {'query': None}
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    in_request = has_request_context() and 'db_queries' in g
+    if in_request:
+        g.db_queries += 1
+        g.db_time += elapsed
+    threshold = _thresholds['query']
+    if threshold is not None and elapsed >= threshold:
+        route = _route() if in_request else 'background'
+        SLOW_QUERIES.inc((route,))
+        logger.warning('Slow query (%.1f ms) on %s: %s', elapsed * 1000, route, statement)
+
+
+def render():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Instrument requests and expose the metrics at /metrics."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _thresholds['query'] = app.config.get('SLOW_QUERY_MS', 200) / 1000
+    slow_request = app.config.get('SLOW_REQUEST_MS', 1000) / 1000
+    server_timing = app.config.get('SERVER_TIMING_HEADER', False)
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if 'request_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        route, method = _route(), request.method
+        REQUESTS.inc((route, method, str(response.status_code)))
+        REQUEST_LATENCY.observe((route, method), elapsed)
+        REQUEST_QUERIES.observe((route, method), g.db_queries)
+        REQUEST_DB_TIME.observe((route, method), g.db_time)
+        if elapsed >= slow_request:
+            logger.warning('Slow request (%.1f ms, %d queries, %.1f ms in SQL): %s %s',
+                           elapsed * 1000, g.db_queries, g.db_time * 1000, method, request.full_path)
+        if server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={g.db_time * 1000:.1f};desc="{g.db_queries} queries", app;dur={elapsed * 1000:.1f}'
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
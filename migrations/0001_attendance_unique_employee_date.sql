@@ -0,0 +1,11 @@
+-- Enforce one attendance record per employee per day (MySQL).
+-- New databases get this index from db.create_all(); run this once on existing ones.
+
+-- Drop duplicate check-ins, keeping the most recent record for each (employee, date)
+DELETE older FROM attendances older
+JOIN attendances newer
+  ON newer.EmployeeID = older.EmployeeID
+ AND newer.Date = older.Date
+ AND newer.AttendanceID > older.AttendanceID;
+
+CREATE UNIQUE INDEX uq_attendances_employee_date ON attendances (EmployeeID, Date);
@@ -0,0 +1,25 @@
+-- Change tracking for delta sync (MySQL).
+-- New databases get these columns and tables from db.create_all(); run this once on existing ones.
+
+ALTER TABLE employees
+  ADD COLUMN CreatedAt DATETIME NULL,
+  ADD COLUMN UpdatedAt DATETIME NULL,
+  ADD INDEX ix_employees_UpdatedAt (UpdatedAt);
+UPDATE employees SET CreatedAt = UTC_TIMESTAMP(), UpdatedAt = UTC_TIMESTAMP();
+
+ALTER TABLE salaries
+  ADD COLUMN CreatedAt DATETIME NULL,
+  ADD COLUMN UpdatedAt DATETIME NULL,
+  ADD INDEX ix_salaries_UpdatedAt (UpdatedAt);
+UPDATE salaries SET CreatedAt = UTC_TIMESTAMP(), UpdatedAt = UTC_TIMESTAMP();
+
+CREATE INDEX ix_attendances_UpdatedAt ON attendances (UpdatedAt);
+
+CREATE TABLE tombstones (
+  TombstoneID INT NOT NULL AUTO_INCREMENT,
+  TableName VARCHAR(64) NOT NULL,
+  RowID INT NOT NULL,
+  DeletedAt DATETIME NOT NULL,
+  PRIMARY KEY (TombstoneID),
+  INDEX ix_tombstones_table_tombstone (TableName, TombstoneID)
+);
@@ -0,0 +1,13 @@
+-- Monthly attendance rollups (MySQL).
+-- New databases get this table from db.create_all(). On existing ones, run this once and then
+-- backfill it with `flask --app app rebuild-attendance-rollups`.
+
+CREATE TABLE attendance_monthly (
+  EmployeeID INT NOT NULL,
+  Period INT NOT NULL,
+  PresentCount INT NOT NULL DEFAULT 0,
+  AbsentCount INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (EmployeeID, Period),
+  INDEX ix_attendance_monthly_period (Period),
+  FOREIGN KEY (EmployeeID) REFERENCES employees (EmployeeID)
+);
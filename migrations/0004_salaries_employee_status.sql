@@ -0,0 +1,4 @@
+-- Composite index backing the payroll aggregates and per-employee salary lookups (MySQL).
+-- New databases get this index from db.create_all(); run this once on existing ones.
+
+CREATE INDEX ix_salaries_employee_status ON salaries (EmployeeID, Status);
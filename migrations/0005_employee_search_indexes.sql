@@ -0,0 +1,6 @@
+-- Indexes backing the prefix matches of /api/employees/search (MySQL).
+-- Email already has its unique index. New databases get these indexes from db.create_all(); run this once on existing ones.
+
+CREATE INDEX ix_employees_first_name ON employees (First_Name(20));
+CREATE INDEX ix_employees_last_name ON employees (Last_Name(20));
+CREATE INDEX ix_employees_phone_number ON employees (Phone_Number);
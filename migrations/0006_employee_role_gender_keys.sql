@@ -0,0 +1,39 @@
+-- Replace the free-text Role and Gender columns of employees with keys of the roles and genders tables (MySQL).
+-- New databases get this schema from db.create_all() (run `flask init-db` to add the genders); run this once on existing ones.
+
+-- Every name in use needs a row to point at
+INSERT INTO roles (Name)
+SELECT DISTINCT e.Role FROM employees e
+WHERE NOT EXISTS (SELECT 1 FROM roles r WHERE r.Name = e.Role);
+
+INSERT INTO genders (Name)
+SELECT DISTINCT e.Gender FROM employees e
+WHERE NOT EXISTS (SELECT 1 FROM genders g WHERE g.Name = e.Gender);
+
+INSERT INTO genders (Name)
+SELECT v.Name FROM (SELECT 'Male' AS Name UNION ALL SELECT 'Female' UNION ALL SELECT 'Other') v
+WHERE NOT EXISTS (SELECT 1 FROM genders g WHERE g.Name = v.Name);
+
+ALTER TABLE employees
+  ADD COLUMN RoleID INT NULL,
+  ADD COLUMN GenderID INT NULL;
+
+-- Names are not unique in the reference tables; like the API, the oldest row wins
+UPDATE employees e
+JOIN (SELECT Name, MIN(RoleID) AS RoleID FROM roles GROUP BY Name) r ON r.Name = e.Role
+SET e.RoleID = r.RoleID;
+
+UPDATE employees e
+JOIN (SELECT Name, MIN(GenderID) AS GenderID FROM genders GROUP BY Name) g ON g.Name = e.Gender
+SET e.GenderID = g.GenderID;
+
+-- Dropping Role also drops its single-column index, where an earlier db.create_all() made one
+ALTER TABLE employees
+  MODIFY RoleID INT NOT NULL,
+  MODIFY GenderID INT NOT NULL,
+  ADD INDEX ix_employees_RoleID (RoleID),
+  ADD INDEX ix_employees_GenderID (GenderID),
+  ADD CONSTRAINT fk_employees_role FOREIGN KEY (RoleID) REFERENCES roles (RoleID),
+  ADD CONSTRAINT fk_employees_gender FOREIGN KEY (GenderID) REFERENCES genders (GenderID),
+  DROP COLUMN Role,
+  DROP COLUMN Gender;
@@ -0,0 +1,29 @@
+-- Cascade employee deletes to their rows and add the attendance archive table (MySQL).
+-- New databases get this schema from db.create_all(); run this once on existing ones.
+-- The constraint names below are InnoDB's defaults; check them with SHOW CREATE TABLE first.
+
+ALTER TABLE salaries
+  DROP FOREIGN KEY salaries_ibfk_1,
+  ADD CONSTRAINT salaries_ibfk_1 FOREIGN KEY (EmployeeID) REFERENCES employees (EmployeeID) ON DELETE CASCADE;
+
+ALTER TABLE attendances
+  DROP FOREIGN KEY attendances_ibfk_1,
+  ADD CONSTRAINT attendances_ibfk_1 FOREIGN KEY (EmployeeID) REFERENCES employees (EmployeeID) ON DELETE CASCADE;
+
+ALTER TABLE attendance_monthly
+  DROP FOREIGN KEY attendance_monthly_ibfk_1,
+  ADD CONSTRAINT attendance_monthly_ibfk_1 FOREIGN KEY (EmployeeID) REFERENCES employees (EmployeeID) ON DELETE CASCADE;
+
+-- Filled by `flask --app app archive-attendances`; AttendanceID values are kept from attendances
+CREATE TABLE attendances_archive (
+  AttendanceID INT NOT NULL,
+  EmployeeID INT NOT NULL,
+  Date DATE NOT NULL,
+  Status ENUM('Present', 'Absent') DEFAULT 'Present',
+  CreatedAt DATETIME NULL,
+  UpdatedAt DATETIME NULL,
+  PRIMARY KEY (AttendanceID),
+  UNIQUE INDEX uq_attendances_archive_employee_date (EmployeeID, Date),
+  INDEX ix_attendances_archive_Date (Date),
+  FOREIGN KEY (EmployeeID) REFERENCES employees (EmployeeID) ON DELETE CASCADE
+);
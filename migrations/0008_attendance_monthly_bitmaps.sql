@@ -0,0 +1,7 @@
+-- Per-day attendance bitmaps on the monthly rollups (MySQL).
+-- New databases get these columns from db.create_all(). On existing ones, run this once and then
+-- fill them with `flask --app app rebuild-attendance-rollups`.
+
+ALTER TABLE attendance_monthly
+  ADD COLUMN PresentDays INT NOT NULL DEFAULT 0,
+  ADD COLUMN AbsentDays INT NOT NULL DEFAULT 0;
@@ -0,0 +1,22 @@
+-- Indexes backing the status and date filters of the employee and attendance collections (MySQL).
+-- New databases get these indexes from db.create_all(), which does not add them to existing tables;
+-- run this once on existing ones. Databases created by db.create_all() already have them, so each is
+-- only created when missing.
+
+SET @sql = IF(
+  EXISTS (SELECT 1 FROM information_schema.statistics
+          WHERE table_schema = DATABASE() AND table_name = 'employees' AND index_name = 'ix_employees_Status'),
+  'DO 0',
+  'CREATE INDEX ix_employees_Status ON employees (Status)');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @sql = IF(
+  EXISTS (SELECT 1 FROM information_schema.statistics
+          WHERE table_schema = DATABASE() AND table_name = 'attendances' AND index_name = 'ix_attendances_Date'),
+  'DO 0',
+  'CREATE INDEX ix_attendances_Date ON attendances (Date)');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,8 @@
+-- Phone numbers without punctuation, matched by the prefix search of /api/employees/search (MySQL).
+-- New databases get this column and index from db.create_all(); run this once on existing ones.
+
+ALTER TABLE employees
+  ADD COLUMN PhoneDigits VARCHAR(25)
+    AS (REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone_Number, ' ', ''), '-', ''), '(', ''), ')', ''), '.', '')) STORED,
+  ADD INDEX ix_employees_phone_digits (PhoneDigits),
+  DROP INDEX ix_employees_phone_number;
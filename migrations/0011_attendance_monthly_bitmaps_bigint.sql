@@ -0,0 +1,7 @@
+-- Widen the per-day attendance bitmaps of the monthly rollups to BIGINT (MySQL).
+-- New databases get these types from db.create_all(); run this once on existing ones, then
+-- `flask --app app rebuild-attendance-rollups` to correct bitmaps built from days counted twice.
+
+ALTER TABLE attendance_monthly
+  MODIFY PresentDays BIGINT NOT NULL DEFAULT 0,
+  MODIFY AbsentDays BIGINT NOT NULL DEFAULT 0;
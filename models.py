@@ -1,8 +1,22 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event, exists
+from sqlalchemy.engine import Engine
+from routing import RoutingSession
+
+# Initialize the SQLAlchemy instance (reads may be routed to a replica, see routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked per connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
 
-# Initialize the SQLAlchemy instance
-db = SQLAlchemy()
 
 # --- Models ---
 class Gender(db.Model):
@@ -31,34 +45,85 @@ class Position(db.Model):
 class Employee(db.Model):
     """Model for Employee data."""
     __tablename__ = 'employees'
+    __table_args__ = (
+        # Search matches prefixes, so MySQL only needs to index the leading characters of the names
+        db.Index('ix_employees_first_name', 'First_Name', mysql_length=20),
+        db.Index('ix_employees_last_name', 'Last_Name', mysql_length=20),
+        db.Index('ix_employees_phone_digits', 'PhoneDigits'),
+    )
     id = db.Column('EmployeeID', db.Integer, primary_key=True, autoincrement=True)
     first_name = db.Column('First_Name', db.String(100), nullable=False)
     last_name = db.Column('Last_Name', db.String(100), nullable=False)
     email = db.Column('Email', db.String(255), unique=True, nullable=True)
     phone_number = db.Column('Phone_Number', db.String(25), nullable=False)
-    gender = db.Column('Gender', db.String(100), nullable=False)  # Changed to Gender string
-    role = db.Column('Role', db.String(100), nullable=False)  # Kept as a string
-    status = db.Column('Status', db.Enum('Active', 'Inactive'), default='Active')
+    # The phone number without the punctuation search ignores (see search.py), maintained by the database
+    phone_digits = db.Column('PhoneDigits', db.String(25), db.Computed(
+        "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone_Number, ' ', ''), '-', ''), '(', ''), ')', ''), '.', '')", persisted=True
+    ))
+    # Stored as keys of the reference tables; the API reads and writes names through lookups.py
+    gender_id = db.Column('GenderID', db.Integer, db.ForeignKey('genders.GenderID'), nullable=False, index=True)
+    role_id = db.Column('RoleID', db.Integer, db.ForeignKey('roles.RoleID'), nullable=False, index=True)
+    status = db.Column('Status', db.Enum('Active', 'Inactive'), default='Active', index=True)
+    created_at = db.Column('CreatedAt', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UpdatedAt', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Most recent first; deleting an employee cascades to them through the database's foreign keys
+    salaries = db.relationship('Salary', back_populates='employee', order_by='Salary.id.desc()', passive_deletes=True)
+    attendances = db.relationship('Attendance', back_populates='employee', order_by='Attendance.date.desc()', passive_deletes=True)
 
 
 class Salary(db.Model):
     """Model for Salary data."""
     __tablename__ = 'salaries'
+    __table_args__ = (
+        db.Index('ix_salaries_employee_status', 'EmployeeID', 'Status'),  # Employee lookups and payroll joins
+    )
     id = db.Column('SalaryID', db.Integer, primary_key=True, autoincrement=True)  # Auto-increment enabled
-    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID'), nullable=False)
+    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID', ondelete='CASCADE'), nullable=False)
     amount = db.Column('Amount', db.Float, nullable=False)
     status = db.Column('Status', db.Enum('Active', 'Inactive'), default='Active')
+    created_at = db.Column('CreatedAt', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UpdatedAt', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    employee = db.relationship('Employee', back_populates='salaries')
 
 
 class Attendance(db.Model):
     """Model for Attendance data."""
     __tablename__ = 'attendances'
+    __table_args__ = (
+        db.Index('uq_attendances_employee_date', 'EmployeeID', 'Date', unique=True),  # One record per employee per day
+        # IDs must never be handed out again once their records are archived: SQLite otherwise reuses
+        # max(rowid) + 1, as does MySQL before 8.0 after a restart
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column('AttendanceID', db.Integer, primary_key=True, autoincrement=True)  # Auto-increment enabled
-    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID'), nullable=False)
-    date = db.Column('Date', db.Date, nullable=False)
+    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID', ondelete='CASCADE'), nullable=False)
+    date = db.Column('Date', db.Date, nullable=False, index=True)
+    status = db.Column('Status', db.Enum('Present', 'Absent'), default='Present')
+    created_at = db.Column('CreatedAt', db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column('UpdatedAt', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    employee = db.relationship('Employee', back_populates='attendances')
+
+
+class AttendanceArchive(db.Model):
+    """Model for attendance records moved out of Attendance by archive.py, with the same columns and IDs."""
+    __tablename__ = 'attendances_archive'
+    __table_args__ = (
+        db.Index('uq_attendances_archive_employee_date', 'EmployeeID', 'Date', unique=True),
+    )
+    id = db.Column('AttendanceID', db.Integer, primary_key=True, autoincrement=False)  # Kept from Attendance
+    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID', ondelete='CASCADE'), nullable=False)
+    date = db.Column('Date', db.Date, nullable=False, index=True)
     status = db.Column('Status', db.Enum('Present', 'Absent'), default='Present')
     created_at = db.Column('CreatedAt', db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column('UpdatedAt', db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column('UpdatedAt', db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def unsuperseded(cls):
+        """Criterion keeping the archived records whose day has no record in Attendance, which wins over them."""
+        return ~exists().where(Attendance.employee_id == cls.employee_id, Attendance.date == cls.date)
 
 
 class Country(db.Model):
@@ -66,3 +131,31 @@ class Country(db.Model):
     __tablename__ = 'countries'
     id = db.Column('CountryID', db.Integer, primary_key=True, autoincrement=True)  # Auto-increment enabled
     name = db.Column('Name', db.String(100), nullable=False)
+
+
+class Tombstone(db.Model):
+    """Model recording deleted rows so delta-sync clients can drop them."""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_table_tombstone', 'TableName', 'TombstoneID'),  # Per-table scans from a high-water mark
+    )
+    id = db.Column('TombstoneID', db.Integer, primary_key=True, autoincrement=True)  # Auto-increment enabled
+    table_name = db.Column('TableName', db.String(64), nullable=False)
+    row_id = db.Column('RowID', db.Integer, nullable=False)
+    deleted_at = db.Column('DeletedAt', db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AttendanceMonthly(db.Model):
+    """Model for per-employee monthly attendance rollups, maintained from Attendance and AttendanceArchive."""
+    __tablename__ = 'attendance_monthly'
+    __table_args__ = (
+        db.Index('ix_attendance_monthly_period', 'Period'),  # Org-wide monthly summaries
+    )
+    employee_id = db.Column('EmployeeID', db.Integer, db.ForeignKey('employees.EmployeeID', ondelete='CASCADE'), primary_key=True)
+    period = db.Column('Period', db.Integer, primary_key=True)  # Year * 100 + month, e.g. 202403
+    present = db.Column('PresentCount', db.Integer, nullable=False, default=0)
+    absent = db.Column('AbsentCount', db.Integer, nullable=False, default=0)
+    # One bit per day of the month (bit 0 is the 1st) with a Present or Absent record, see bitmaps.py
+    # BIGINT, as day 31 is bit 30 and leaves no room in a signed INT should a sum ever carry
+    present_days = db.Column('PresentDays', db.BigInteger, nullable=False, default=0)
+    absent_days = db.Column('AbsentDays', db.BigInteger, nullable=False, default=0)
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import date, datetime
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import and_, or_
+
+# Page size limits for the collection endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decode a cursor back into values typed like the given columns."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+        # Only scalars of the column's type may reach the query: JSON also decodes lists, objects and null
+        expected = (int, float) if python_type is float else python_type
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def resolve_sort(sort, sorts):
+    """Map a `sort` argument such as 'last_name' or '-date' to (column, descending)."""
+    sort = sort or 'id'
+    descending = sort.startswith('-')
+    column = sorts.get(sort.lstrip('-'))
+    if column is None:
+        raise ValueError(f"Invalid sort field '{sort.lstrip('-')}'. Allowed values are: {', '.join(sorts)}")
+    return column, descending
+
+
+def _after(columns, values, descending):
+    """Build the keyset predicate selecting rows strictly after `values`."""
+    clauses = []
+    for i, column in enumerate(columns):
+        comparison = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[columns[j] == values[j] for j in range(i)], comparison))
+    return or_(*clauses)
+
+
+def page_query(query, args, sorts):
+    """
+    Restrict `query` (a Query or a select()) to one keyset page, plus one
+    row telling whether there is a next page. Returns it with the sort key
+    columns that `page_result` needs.
+    """
+    pk = sorts['id']
+    column, descending = resolve_sort(args.get('sort'), sorts)
+    columns = [pk] if column is pk else [column, pk]
+
+    if args.get('cursor'):
+        query = query.filter(_after(columns, decode_cursor(args['cursor'], columns), descending))
+
+    limit = args.get('limit') or DEFAULT_PAGE_SIZE
+    order = [c.desc() if descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1), columns
+
+
+def page_result(rows, columns, args):
+    """Split the rows fetched by a `page_query` into the page and the cursor of the next one."""
+    limit = args.get('limit') or DEFAULT_PAGE_SIZE
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in columns])
+    return rows, next_cursor
+
+
+def paginate(query, args, sorts):
+    """
+    Return one keyset page of `query` and the cursor of the next page.
+
+    Rows are ordered by the requested sort column with the primary key
+    (`sorts['id']`) as tie-breaker, so every page is a single index range
+    scan no matter how deep the client has paged.
+    """
+    query, columns = page_query(query, args, sorts)
+    return page_result(query.all(), columns, args)
+
+
+def page_headers(next_cursor):
+    """Response headers advertising the next page, if there is one."""
+    if next_cursor is None:
+        return {}
+    args = request.args.to_dict(flat=False)
+    args['cursor'] = [next_cursor]
+    return {
+        'Link': f'<{request.base_url}?{urlencode(args, doseq=True)}>; rel="next"',
+        'X-Next-Cursor': next_cursor,
+    }
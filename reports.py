@@ -0,0 +1,170 @@
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from export import iter_export
+from models import db
+
+logger = logging.getLogger(__name__)
+
+REPORT_COMPRESSIONS = ['gzip', 'none']
+
+
+class JobCancelled(Exception):
+    """Raised inside a running report job once it has been cancelled."""
+
+
+class ReportJob:
+    """State of one report: queued, running, completed, failed or cancelled."""
+
+    def __init__(self, report, fmt, compression):
+        self.id = uuid.uuid4().hex
+        self.report = report
+        self.format = fmt
+        self.compression = compression
+        self.status = 'queued'
+        self.rows_total = None
+        self.rows_written = 0
+        self.error = None
+        self.path = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.cancelled = threading.Event()
+
+    @property
+    def filename(self):
+        return f'{self.report}-{self.id}.{self.format}' + ('.gz' if self.compression == 'gzip' else '')
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def dump(self):
+        return {
+            'id': self.id,
+            'report': self.report,
+            'format': self.format,
+            'compression': self.compression,
+            'status': self.status,
+            'rows_total': self.rows_total,
+            'rows_written': self.rows_written,
+            'progress': round(self.rows_written / self.rows_total, 4) if self.rows_total else (1.0 if self.status == 'completed' else 0.0),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at and self.started_at.isoformat(),
+            'finished_at': self.finished_at and self.finished_at.isoformat(),
+        }
+
+
+class ReportJobs:
+    """
+    Runs report exports in a local thread pool and keeps their files.
+
+    A job writes the rows of a statement to a file in REPORTS_DIR, reading
+    them in chunks from a server-side cursor; it checks for cancellation
+    between chunks. Jobs are tracked in memory, so a job can only be
+    polled and downloaded from the worker process that started it, and
+    finished jobs and their files are dropped after REPORTS_RETENTION_SECONDS.
+    """
+
+    def __init__(self, max_workers=2, max_pending=20, directory=None, retention=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'employee-reports')
+        self.retention = retention
+        self.app = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def init_app(self, app):
+        """Configure the pool and storage from the application config."""
+        self.app = app
+        self.max_workers = app.config.get('REPORTS_MAX_WORKERS', self.max_workers)
+        self.max_pending = app.config.get('REPORTS_MAX_PENDING', self.max_pending)
+        self.directory = app.config.get('REPORTS_DIR') or self.directory
+        self.retention = app.config.get('REPORTS_RETENTION_SECONDS', self.retention)
+
+    def submit(self, report, stmt, fieldnames, fmt, compression):
+        """
+        Start exporting `stmt` in the background and return its job, or None
+        when REPORTS_MAX_PENDING jobs are already queued or running.
+        """
+        self._expire()
+        job = ReportJob(report, fmt, compression)
+        with self._lock:
+            if sum(1 for j in self._jobs.values() if not j.finished) >= self.max_pending:
+                return None
+            if self._executor is None:
+                # Created on first use, so workers forked after boot get their own threads
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='report')
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, stmt, fieldnames)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job):
+        """Cancel a queued or running job; a running one stops at its next chunk."""
+        job.cancelled.set()
+        if job.future.cancel():
+            job.status, job.finished_at = 'cancelled', datetime.utcnow()
+
+    def remove(self, job):
+        """Forget a finished job and delete its file."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        if job.path and os.path.exists(job.path):
+            os.remove(job.path)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [j for j in self._jobs.values() if j.finished and j.finished_at.timestamp() < cutoff]
+        for job in expired:
+            self.remove(job)
+
+    def _run(self, job, stmt, fieldnames):
+        job.status, job.started_at = 'running', datetime.utcnow()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, job.filename)
+        partial = path + '.part'
+
+        def progress(rows):
+            if job.cancelled.is_set():
+                raise JobCancelled()
+            job.rows_written += rows
+
+        try:
+            with self.app.app_context():
+                job.rows_total = db.session.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+                opener = gzip.open if job.compression == 'gzip' else open
+                with opener(partial, 'wt', newline='', encoding='utf-8') as f:
+                    for chunk in iter_export(stmt, fieldnames, job.format, progress=progress):
+                        f.write(chunk)
+            os.replace(partial, path)
+            job.path, job.status = path, 'completed'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.exception('Report job %s failed', job.id)
+            job.status, job.error = 'failed', str(e)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+            job.finished_at = datetime.utcnow()
+
+
+report_jobs = ReportJobs()
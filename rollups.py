@@ -0,0 +1,145 @@
+from datetime import date
+
+from sqlalchemy import Integer, and_, case, delete, extract, func, insert, inspect, literal, or_, select, tuple_, union_all
+
+from models import db, Attendance, AttendanceArchive, AttendanceMonthly, Employee
+from upsert import upsert
+
+# Rollup keys recomputed per statement
+REFRESH_CHUNK_SIZE = 500
+
+
+def period_of(day):
+    """The rollup period (YYYYMM as an integer) of a date."""
+    return day.year * 100 + day.month
+
+
+def format_period(period):
+    return f'{period // 100:04d}-{period % 100:02d}'
+
+
+def _period_bounds(period):
+    """First day of the period and first day of the following one."""
+    year, month = divmod(period, 100)
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
+def _aggregate(criteria, current=False):
+    """
+    SELECT computing rollup rows from the attendance table and its archive.
+
+    `criteria(model)` returns the WHERE clauses for either table, so each
+    branch of the UNION is filtered through its own indexes. An archived
+    record only counts when its day has no record in the attendance table,
+    so each day is counted once. With `current` the rows are read with
+    shared locks, which see the latest committed records instead of the
+    transaction's snapshot.
+    """
+    branches = [
+        select(Attendance.employee_id, Attendance.date, Attendance.status).where(*criteria(Attendance)),
+        select(AttendanceArchive.employee_id, AttendanceArchive.date, AttendanceArchive.status)
+        .where(*criteria(AttendanceArchive), AttendanceArchive.unsuperseded()),
+    ]
+    if current:
+        # MySQL only accepts locking branches of a UNION in parentheses, which SQLite rejects;
+        # SQLite has no row locks and serializes writers anyway
+        branches = [branch.with_for_update(read=True).self_group() for branch in branches]
+    source = union_all(*branches).subquery()
+    period = (extract('year', source.c.date) * 100 + extract('month', source.c.date)).label('period')
+    # Each day is read once, from one table or the other, so summing the day bits ORs them into the month's bitmap
+    day_bit = literal(1).op('<<', return_type=Integer)(extract('day', source.c.date) - 1)
+    return select(
+        source.c.employee_id,
+        period,
+        func.sum(case((source.c.status == 'Present', 1), else_=0)).label('present'),
+        func.sum(case((source.c.status == 'Absent', 1), else_=0)).label('absent'),
+        func.sum(case((source.c.status == 'Present', day_bit), else_=0)).label('present_days'),
+        func.sum(case((source.c.status == 'Absent', day_bit), else_=0)).label('absent_days'),
+    ).group_by(source.c.employee_id, period)
+
+
+def keys_where(criteria):
+    """The (employee_id, period) pairs of the attendance rows matching `criteria`."""
+    period = extract('year', Attendance.date) * 100 + extract('month', Attendance.date)
+    return db.session.execute(select(Attendance.employee_id, period).where(*criteria).distinct()).tuples().all()
+
+
+def _empty(key):
+    employee_id, period = key
+    return {'employee_id': employee_id, 'period': period, 'present': 0, 'absent': 0, 'present_days': 0, 'absent_days': 0}
+
+
+def lock(keys):
+    """
+    Lock the rollup rows of the given (employee_id, period) pairs for the
+    rest of the caller's transaction, creating empty ones where missing.
+
+    Attendance write paths call this before writing any attendance row and
+    refresh() once they are done, so concurrent writers of an employee-month
+    take turns instead of each overwriting the rollup with a count missing
+    the other's records. Locking the rollups first, in key order, keeps
+    them from deadlocking on each other's attendance rows.
+    """
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), REFRESH_CHUNK_SIZE):
+        # Setting a key to itself takes the row lock of the existing rollups too
+        upsert(AttendanceMonthly, [_empty(key) for key in keys[start:start + REFRESH_CHUNK_SIZE]],
+               keys=['employee_id', 'period'], update=['period'])
+
+
+def refresh(keys):
+    """
+    Recompute the rollups of the given (employee_id, period) pairs from the
+    attendance table and its archive, inside the caller's transaction, which
+    has locked them with lock() before writing.
+
+    Each pair only reads one employee-month through the (EmployeeID, Date)
+    index, so keeping rollups current costs the same whatever the size of
+    the attendance history. Attendance write paths call this before commit.
+    """
+    keys = list(set(keys))
+    current = db.session.get_bind(mapper=inspect(Attendance)).dialect.name != 'sqlite'
+    for start in range(0, len(keys), REFRESH_CHUNK_SIZE):
+        chunk = keys[start:start + REFRESH_CHUNK_SIZE]
+        bounds = [(employee_id, *_period_bounds(period)) for employee_id, period in chunk]
+
+        def ranges(model):
+            return [or_(*(
+                and_(model.employee_id == employee_id, model.date >= first, model.date < following)
+                for employee_id, first, following in bounds
+            ))]
+
+        rows = [dict(row._mapping) for row in db.session.execute(_aggregate(ranges, current))]
+        upsert(AttendanceMonthly, rows, keys=['employee_id', 'period'], update=['present', 'absent', 'present_days', 'absent_days'])
+
+        # Employee-months left without any attendance lose their rollup row
+        emptied = set(chunk) - {(row['employee_id'], row['period']) for row in rows}
+        if emptied:
+            db.session.execute(delete(AttendanceMonthly).where(
+                tuple_(AttendanceMonthly.employee_id, AttendanceMonthly.period).in_(emptied)
+            ))
+
+
+def rebuild(batch_size=1000):
+    """
+    Rebuild every rollup from the attendance table and its archive, one
+    transaction per batch of employees. Returns the number of employees
+    processed.
+    """
+    processed, last_id = 0, 0
+    while True:
+        employee_ids = db.session.scalars(
+            select(Employee.id).where(Employee.id > last_id).order_by(Employee.id).limit(batch_size)
+        ).all()
+        if not employee_ids:
+            return processed
+        first, last_id = employee_ids[0], employee_ids[-1]
+
+        db.session.execute(delete(AttendanceMonthly).where(AttendanceMonthly.employee_id.between(first, last_id)))
+        db.session.execute(insert(AttendanceMonthly).from_select(
+            [AttendanceMonthly.employee_id, AttendanceMonthly.period, AttendanceMonthly.present, AttendanceMonthly.absent,
+             AttendanceMonthly.present_days, AttendanceMonthly.absent_days],
+            _aggregate(lambda model: [model.employee_id.between(first, last_id)]),
+        ))
+        db.session.commit()
+        processed += len(employee_ids)
@@ -0,0 +1,66 @@
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from changes import on_commit
+
+# Cookie holding the time until which a client that just wrote reads from the primary
+STICKY_COOKIE = 'db_primary_until'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """
+    Session sending the reads of read-only requests to the 'replica' bind,
+    when one is configured, and everything else to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if not has_request_context() or not g.get('read_from_replica'):
+            return False
+        if self._flushing or isinstance(clause, UpdateBase):
+            return False
+        return 'replica' in self._db.engines
+
+
+def reads_from_replica():
+    """Whether the current request reads from the replica."""
+    return has_request_context() and bool(g.get('read_from_replica')) and 'replica' in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def read_from_primary():
+    """Send the rest of the current request's reads to the primary."""
+    g.read_from_replica = False
+
+
+def init_app(app):
+    """Register the request hooks deciding where each request reads from."""
+
+    @app.before_request
+    def choose_read_bind():
+        try:
+            primary_until = float(request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        g.read_from_replica = request.method in READ_METHODS and primary_until < time.time()
+
+    @app.after_request
+    def stick_to_primary(response):
+        # Read-your-writes: after a commit, keep this client on the primary for a while
+        sticky_seconds = app.config.get('DB_REPLICA_STICKY_SECONDS', 0)
+        if g.get('committed_writes') and sticky_seconds and 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+            response.set_cookie(STICKY_COOKIE, str(time.time() + sticky_seconds), max_age=sticky_seconds, httponly=True)
+        return response
+
+
+@on_commit
+def _remember_write(tables):
+    if has_request_context():
+        g.committed_writes = True
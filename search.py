@@ -0,0 +1,198 @@
+import heapq
+import re
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import case, func, or_, select
+
+from changes import on_commit
+from models import db, Employee, Tombstone
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Rows updated this long before the index's high-water mark are re-read on
+# refresh, covering transactions that committed after others with later stamps
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+# Ignored in phone numbers; the same characters Employee.phone_digits leaves out
+_PHONE_PUNCTUATION = re.compile(r'[ \-().]')
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def prefix_search(query, q):
+    """
+    Restrict an employee query to names, emails or phone numbers starting
+    with `q`, best matches first.
+
+    Every condition is a prefix LIKE, which the indexes on the four columns
+    can serve; phone numbers are matched without punctuation, on both sides.
+    "first last" queries also match the two names together.
+    """
+    q = q.strip()
+    pattern = _escape_like(q) + '%'
+    phone_pattern = _escape_like(_PHONE_PUNCTUATION.sub('', q)) + '%'
+    criteria = [
+        Employee.first_name.like(pattern, escape='\\'),
+        Employee.last_name.like(pattern, escape='\\'),
+        Employee.email.like(pattern, escape='\\'),
+        Employee.phone_digits.like(phone_pattern, escape='\\'),
+    ]
+    first, _, last = q.partition(' ')
+    if last.strip():
+        criteria.append(Employee.first_name.like(_escape_like(first), escape='\\')
+                        & Employee.last_name.like(_escape_like(last.strip()) + '%', escape='\\'))
+    score = case(
+        (or_(func.lower(Employee.first_name) == q.lower(), func.lower(Employee.last_name) == q.lower(),
+             func.lower(Employee.email) == q.lower()), 3),
+        (or_(*criteria[:2], *criteria[4:]), 2),
+        else_=1,
+    )
+    return query.filter(or_(*criteria)).order_by(score.desc(), Employee.last_name, Employee.first_name, Employee.id)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _searchable(first_name, last_name, email, phone_number):
+    """The lowercased fields a document is matched on, most important first."""
+    return (
+        f'{first_name} {last_name}'.lower(),
+        (last_name or '').lower(),
+        (email or '').lower(),
+        _PHONE_PUNCTUATION.sub('', phone_number or ''),
+    )
+
+
+# Weight of a match in each searchable field: names rank above email and phone
+_FIELD_WEIGHTS = (2, 2, 1, 1)
+
+
+class SearchIndex:
+    """
+    In-memory trigram index of employee names, emails and phone numbers.
+
+    It finds substrings anywhere in those fields, which prefix indexes
+    cannot. The index is built on the first search and then refreshed
+    incrementally from the updated_at index and the employee tombstones:
+    right away after a local commit touches employees, and at least every
+    SEARCH_INDEX_MAX_LAG seconds for writes made by other processes.
+    """
+
+    def __init__(self, max_lag=5):
+        self.enabled = False
+        self.max_lag = max_lag
+        self.stale = True
+        self._documents = {}
+        self._postings = {}
+        self._updated_at = None
+        self._tombstone_id = None
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Enable the index from the application config."""
+        self.enabled = app.config.get('SEARCH_INDEX_ENABLED', False)
+        self.max_lag = app.config.get('SEARCH_INDEX_MAX_LAG', self.max_lag)
+
+    def _add(self, employee_id, fields):
+        self._remove(employee_id)
+        self._documents[employee_id] = fields
+        for gram in set().union(*map(_trigrams, fields)):
+            self._postings.setdefault(gram, set()).add(employee_id)
+
+    def _remove(self, employee_id):
+        fields = self._documents.pop(employee_id, None)
+        if fields is None:
+            return
+        for gram in set().union(*map(_trigrams, fields)):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(employee_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def _refresh(self):
+        """Apply the employee writes and deletes made since the last refresh."""
+        columns = select(Employee.id, Employee.first_name, Employee.last_name, Employee.email,
+                         Employee.phone_number, Employee.updated_at)
+        tombstones = select(Tombstone.id, Tombstone.row_id).where(Tombstone.table_name == Employee.__tablename__)
+        if self._updated_at is None:
+            self._tombstone_id = db.session.scalar(select(func.max(Tombstone.id)).where(Tombstone.table_name == Employee.__tablename__)) or 0
+            rows = db.session.execute(columns)
+            deleted = []
+        else:
+            rows = db.session.execute(columns.where(Employee.updated_at >= self._updated_at - REFRESH_OVERLAP))
+            deleted = db.session.execute(tombstones.where(Tombstone.id > self._tombstone_id).order_by(Tombstone.id)).all()
+
+        for employee_id, first_name, last_name, email, phone_number, updated_at in rows:
+            self._add(employee_id, _searchable(first_name, last_name, email, phone_number))
+            if updated_at is not None and (self._updated_at is None or updated_at > self._updated_at):
+                self._updated_at = updated_at
+        for tombstone_id, employee_id in deleted:
+            self._remove(employee_id)
+            self._tombstone_id = tombstone_id
+        if self._updated_at is None:
+            self._updated_at = db.session.scalar(select(func.max(Employee.updated_at))) or self._updated_at
+        self.stale = False
+        self._refreshed = time.monotonic()
+
+    def _score(self, q, fields):
+        """Rank a document: exact field matches above prefixes above other substrings."""
+        best = 0
+        for value, weight in zip(fields, _FIELD_WEIGHTS):
+            if value.startswith(q):
+                score = (4 if len(value) == len(q) else 3) * weight
+            elif q in value:
+                score = weight
+            else:
+                continue
+            if score > best:
+                best = score
+        return best
+
+    def search(self, q, limit):
+        """
+        The IDs of the best `limit` matches for `q`, or None when the index
+        cannot answer (disabled, or `q` shorter than a trigram).
+        """
+        q = q.strip().lower()
+        if not self.enabled or len(q) < 3:
+            return None
+        with self._lock:
+            if self.stale or not self._documents or time.monotonic() - self._refreshed > self.max_lag:
+                self._refresh()
+            candidates = self._candidates(q)
+            # Phone numbers are indexed without punctuation, so "012-345" also looks for "012345"
+            phone = _PHONE_PUNCTUATION.sub('', q)
+            if phone == q or len(phone) < 3:
+                phone = None
+            else:
+                candidates |= self._candidates(phone)
+            documents, score = self._documents, self._score
+            scored = (
+                (-max(score(q, documents[employee_id]), score(phone, documents[employee_id]) if phone else 0), employee_id)
+                for employee_id in candidates
+            )
+            best = heapq.nsmallest(limit, (item for item in scored if item[0]))
+        return [employee_id for _, employee_id in best]
+
+    def _candidates(self, text):
+        """Documents containing every trigram of `text`, intersecting the rarest postings first."""
+        postings = sorted((self._postings.get(gram, set()) for gram in _trigrams(text)), key=len)
+        return set(postings[0]).intersection(*postings[1:]) if postings else set()
+
+
+search_index = SearchIndex()
+
+
+@on_commit
+def _mark_stale(tables):
+    """Refresh the search index before its next search once employees have changed."""
+    if Employee.__tablename__ in tables:
+        search_index.stale = True
@@ -0,0 +1,112 @@
+import json
+from datetime import date, datetime
+
+from flask import make_response
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stdlib encoder is used without it
+    orjson = None
+
+from models import db
+
+
+def encode_value(value):
+    """Encode dates and datetimes as ISO 8601 strings, for every format the API writes."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    encoded = encode_value(value)
+    if encoded is value:
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+    return encoded
+
+
+class Coded:
+    """
+    A field stored as an integer key and exposed by name, decoded through a
+    lookup with a `name(id)` method (see lookups.py).
+    """
+
+    def __init__(self, column, lookup):
+        self.column = column
+        self.lookup = lookup
+
+
+class Serializer:
+    """
+    API representation of a model.
+
+    Maps API field names to model columns, selects only the requested
+    columns as plain row tuples, and turns those rows (or full entities)
+    into dicts with consistently encoded dates.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def parse_fields(self, value):
+        """The field names requested by a `fields` argument; all fields when it is empty."""
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Invalid field '{unknown[0]}'. Allowed values are: {', '.join(self.fields)}")
+        return names
+
+    def column(self, name):
+        """The model column a field is read from."""
+        field = self.fields[name]
+        return field.column if isinstance(field, Coded) else field
+
+    def aliased(self, entity):
+        """The same fields read from `entity`, an alias of the model such as one over a UNION."""
+        fields = {}
+        for name, field in self.fields.items():
+            if isinstance(field, Coded):
+                fields[name] = Coded(getattr(entity, field.column.key), field.lookup)
+            else:
+                fields[name] = getattr(entity, field.key)
+        return Serializer(**fields)
+
+    def columns(self, names, *extra):
+        """The columns of the requested fields plus `extra` columns, without duplicates."""
+        columns = []
+        for column in [self.column(name) for name in names] + list(extra):
+            if not any(column is c for c in columns):
+                columns.append(column)
+        return columns
+
+    def query(self, names, *extra):
+        """
+        Query the columns of the requested fields, plus `extra` columns such
+        as the keyset columns, as plain rows without hydrating ORM entities.
+        """
+        return db.session.query(*self.columns(names, *extra))
+
+    def value(self, obj, name):
+        """The API value of a field of an entity or a projected row."""
+        field = self.fields[name]
+        if isinstance(field, Coded):
+            return field.lookup.name(getattr(obj, field.column.key))
+        return encode_value(getattr(obj, field.key))
+
+    def dump(self, obj, names=None):
+        """Serialize an entity or a projected row to a dict of the requested fields."""
+        return {name: self.value(obj, name) for name in names or self.fields}
+
+
+def output_json(data, code, headers=None):
+    """Render API responses as compact JSON, through orjson when it is installed."""
+    if orjson is not None:
+        body = orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(data, separators=(',', ':'), default=_json_default) + '\n'
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
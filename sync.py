@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, event, func, insert, inspect, literal, or_, select
+from sqlalchemy.orm import Session
+
+from models import db, Tombstone
+from pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+
+# Tables whose deletes are recorded for delta-sync clients
+SYNC_TABLES = {'employees', 'salaries', 'attendances'}
+
+# Rows and tombstones stamped this recently may belong to transactions that
+# have not committed yet, so a finished sync hands out a token that reads
+# them again next time
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    """Leave a tombstone for every synced row deleted through the ORM."""
+    for obj in list(session.deleted):
+        table = inspect(obj).mapper.local_table.name
+        if table in SYNC_TABLES:
+            session.add(Tombstone(table_name=table, row_id=obj.id))
+
+
+def record_deletes(model, criteria):
+    """
+    Leave a tombstone for every synced row a set-based DELETE with
+    `criteria` is about to remove, with a single INSERT ... SELECT.
+    """
+    table = model.__tablename__
+    if table not in SYNC_TABLES:
+        return
+    db.session.execute(insert(Tombstone).from_select(
+        [Tombstone.table_name, Tombstone.row_id, Tombstone.deleted_at],
+        select(literal(table), model.id, literal(datetime.utcnow())).where(*criteria),
+    ))
+
+
+def parse_since(value, model):
+    """
+    Parse an `updated_since` argument into (updated_at, id, tombstone_id).
+
+    The argument is either an ISO 8601 timestamp, for a first sync, or the
+    `sync_token` returned by the previous delta response. Tokens are client
+    input like any other, so their fields are checked before reaching the
+    queries, and a malformed one raises ValueError.
+    """
+    try:
+        since, last_id, tombstone_id = datetime.fromisoformat(value), 0, None
+    except ValueError:
+        error = ValueError('updated_since must be an ISO 8601 timestamp or a sync token')
+        try:
+            since, last_id, tombstone_id = decode_cursor(value, [model.updated_at, model.id, Tombstone.id])
+        except ValueError:
+            raise error
+        if not isinstance(since, datetime) or any(
+            isinstance(field, bool) or not isinstance(field, int) for field in (last_id, tombstone_id)
+        ):
+            raise error
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since, last_id, tombstone_id
+
+
+def delta(model, query, args, serialize):
+    """
+    Return the rows of `query` changed after `args['updated_since']` and the
+    IDs deleted since then, with a high-water-mark token for the next call.
+
+    Changed rows are read in (updated_at, id) order from the updated_at
+    index and deletes from the tombstones table, so the cost of a sync is
+    proportional to the churn since the last one rather than to table size.
+
+    Timestamps and IDs are assigned at flush time but become visible at
+    commit, in a different order, so the token of the last page is rewound
+    to SYNC_OVERLAP ago: the next call returns the changes and deletes of
+    that window again, including any that committed late, and clients
+    apply items and deletes by ID.
+    """
+    updated_at, last_id, tombstone_id = parse_since(args['updated_since'], model)
+    table = model.__tablename__
+    limit = args.get('limit') or DEFAULT_PAGE_SIZE
+
+    rows = query.filter(or_(
+        model.updated_at > updated_at,
+        and_(model.updated_at == updated_at, model.id > last_id),
+    )).order_by(model.updated_at, model.id).limit(limit + 1).all()
+
+    tombstones = select(Tombstone.id, Tombstone.row_id).where(Tombstone.table_name == table)
+    if tombstone_id is None:
+        # First sync: deletes are found by time, later ones by tombstone ID
+        tombstones = tombstones.where(Tombstone.deleted_at >= updated_at)
+    else:
+        tombstones = tombstones.where(Tombstone.id > tombstone_id)
+    deleted = db.session.execute(tombstones.order_by(Tombstone.id).limit(limit + 1)).all()
+
+    has_more = len(rows) > limit or len(deleted) > limit
+    rows, deleted = rows[:limit], deleted[:limit]
+    if rows:
+        updated_at, last_id = rows[-1].updated_at, rows[-1].id
+    if deleted:
+        tombstone_id = deleted[-1].id
+    elif tombstone_id is None:
+        tombstone_id = db.session.scalar(select(func.max(Tombstone.id)).where(Tombstone.table_name == table)) or 0
+    if not has_more:
+        settled = datetime.utcnow() - SYNC_OVERLAP
+        if updated_at > settled:
+            updated_at, last_id = settled, 0
+        settled_tombstone = db.session.scalar(
+            select(Tombstone.id).where(Tombstone.table_name == table, Tombstone.deleted_at < settled)
+            .order_by(Tombstone.id.desc()).limit(1)
+        ) or 0
+        tombstone_id = min(tombstone_id, settled_tombstone)
+
+    return {
+        'items': [serialize(row) for row in rows],
+        'deleted': [row_id for _, row_id in deleted],
+        'sync_token': encode_cursor([updated_at, last_id, tombstone_id]),
+        'has_more': has_more,
+    }
@@ -0,0 +1,42 @@
+from sqlalchemy import inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import db
+
+# Dialect-specific INSERT constructs that support a native upsert clause
+_INSERTS = {
+    'mysql': mysql.insert,
+    'mariadb': mysql.insert,
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def upsert(model, rows, keys, update, values=None):
+    """
+    Insert `rows` or update the existing rows sharing their unique `keys`,
+    as a single INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT statement.
+
+    `rows` are dicts keyed by model attribute name. On conflict the `update`
+    attributes are overwritten with the incoming values and the `values`
+    attributes are set to the given constants (e.g. a fresh `updated_at`).
+    """
+    if not rows:
+        return None
+    columns = inspect(model).columns
+    dialect = db.session.get_bind(mapper=inspect(model)).dialect.name
+    if dialect not in _INSERTS:
+        raise NotImplementedError(f"Upsert is not supported on the '{dialect}' dialect")
+
+    stmt = _INSERTS[dialect](model.__table__).values(
+        [{columns[attr].key: value for attr, value in row.items()} for row in rows]
+    )
+    new = stmt.inserted if dialect in ('mysql', 'mariadb') else stmt.excluded
+    set_ = {columns[attr].key: new[columns[attr].key] for attr in update}
+    set_.update({columns[attr].key: value for attr, value in (values or {}).items()})
+
+    if dialect in ('mysql', 'mariadb'):
+        stmt = stmt.on_duplicate_key_update(set_)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=[columns[attr] for attr in keys], set_=set_)
+    return db.session.execute(stmt)
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Ticket:
+    """Tracks one buffered item until the flush that writes it."""
+
+    def __init__(self, item):
+        self.id = uuid.uuid4().hex
+        self.item = item
+        self.result = None
+        self._done = threading.Event()
+
+    def resolve(self, result):
+        self.result = result
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Wait for the item to be flushed; False if `timeout` seconds pass first."""
+        return self._done.wait(timeout)
+
+    def dump(self):
+        if self.result is None:
+            return {'id': self.id, 'status': 'queued'}
+        return {'id': self.id, **{k: v for k, v in self.result.items() if k != 'index'}}
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer that group-commits items submitted by request threads.
+
+    A background thread drains the queue and hands `flush` up to `max_items`
+    items, or whatever arrived within `flush_ms` of the first one, so many
+    small writes share one statement and one commit. `flush` returns one
+    result dict per item, in order, with a 'status' of 'error' for failures;
+    when it raises, the batch is flushed again in halves.
+
+    The thread starts on the first submit rather than at boot, so it is
+    created in each worker after the fork. Items are only durable once
+    flushed; remaining items are flushed at interpreter exit.
+    """
+
+    def __init__(self, flush, max_items=500, flush_ms=20, max_queue=10000, history=100000):
+        self.flush = flush
+        self.max_items = max_items
+        self.flush_ms = flush_ms
+        self.enabled = False
+        self.app = None
+        self.queue = queue.Queue(max_queue)
+        self.history = history
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app, prefix):
+        """Configure the buffer from the `<prefix>_*` settings of the application config."""
+        config = app.config
+        self.app = app
+        self.enabled = config.get(f'{prefix}_ENABLED', False)
+        self.max_items = config.get(f'{prefix}_MAX_ITEMS', self.max_items)
+        self.flush_ms = config.get(f'{prefix}_FLUSH_MS', self.flush_ms)
+        with self._lock:
+            # A started thread keeps reading the queue it started with, so only a buffer that never ran gets a new one
+            if self._thread is None:
+                self.queue = queue.Queue(config.get(f'{prefix}_QUEUE_SIZE', self.queue.maxsize))
+
+    def submit(self, item):
+        """Queue `item` and return its Ticket; raises queue.Full when the buffer is full."""
+        ticket = Ticket(item)
+        self._start()
+        self.queue.put_nowait(ticket)
+        with self._lock:
+            self._tickets[ticket.id] = ticket
+            while len(self._tickets) > self.history:
+                self._tickets.popitem(last=False)
+        return ticket
+
+    def ticket(self, ticket_id):
+        """The ticket of a recently submitted item, or None if unknown or forgotten."""
+        with self._lock:
+            return self._tickets.get(ticket_id)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-buffer', daemon=True)
+                self._thread.start()
+                atexit.register(self._stop)
+
+    def _stop(self):
+        try:
+            self.queue.put(_STOP, timeout=10)
+        except queue.Full:
+            return
+        self._thread.join(timeout=10)
+
+    def _next_batch(self):
+        """Block for the first item, then collect more until the batch is full or the interval ends."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.max_items and batch[-1] is not _STOP:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stopping = batch[-1] is _STOP
+            tickets = [t for t in batch if t is not _STOP]
+            if tickets:
+                self._flush(tickets)
+            if stopping:
+                return
+
+    def _flush(self, tickets):
+        with self.app.app_context():
+            self._write(tickets)
+
+    def _write(self, tickets):
+        """
+        Flush `tickets` together, or in halves when that fails, so one bad
+        item (e.g. a conflict with a concurrent write) only fails itself.
+        """
+        try:
+            results = self.flush([t.item for t in tickets])
+        except Exception as e:
+            db.session.rollback()
+            if len(tickets) > 1:
+                logger.warning('Flushing %d buffered writes failed, retrying them in halves: %s', len(tickets), e)
+                half = len(tickets) // 2
+                self._write(tickets[:half])
+                self._write(tickets[half:])
+                return
+            logger.exception('Flushing a buffered write failed')
+            results = [{'status': 'error', 'errors': {'item': str(e)}}]
+        for ticket, result in zip(tickets, results):
+            ticket.resolve(result)